@@ -5,7 +5,7 @@ import logging
 
 from db.database import get_db
 from db.models import User as UserModel
-from db.crud import get_user_by_email
+from db.crud import create_user, get_user_by_email
 from schemas.user import UserCreate, UserLogin, UserPublic, Token
 from core.security import (
     get_password_hash,
@@ -30,17 +30,14 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
             )
 
         hashed_password = get_password_hash(user.password)
-        new_user = UserModel(
+        new_user = await create_user(
+            db,
             email=str(user.email),
-            hashed_password=hashed_password,
             full_name=user.full_name,
+            hashed_password=hashed_password,
             role=user.role
         )
 
-        db.add(new_user)
-        await db.commit()
-        await db.refresh(new_user)
-
         return UserPublic(
             id=new_user.id,
             email=new_user.email,
@@ -1,79 +1,328 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from db.database import get_db
-from db.crud import create_batch_prediction, get_user_batch_predictions
+from db.database import async_session, get_db
+from db.crud import (
+    create_batch_prediction, create_batch_job, find_batch_by_content_hash, get_batch_prediction,
+    get_user_batch_predictions
+)
 from db.models import BatchPrediction
-from core.model_utils import batch_predict_cvd_risk
+from core.batch_jobs import batch_job_runner, count_csv_rows, persist_batch_predictions_safely, save_job_upload
+from core.batch_pipeline import (
+    BatchInputError, RecordListSink, ResultSink, TeeSink, csv_content_hash, json_records_features,
+    read_ndjson_features, run_batch_pipeline
+)
+from core.model_utils import (
+    FEATURE_NAMES, batch_csv_columns, get_models, score_feature_matrix, scored_batch_csv, scored_batch_ndjson,
+    scored_batch_records
+)
+from core.pagination import (
+    InvalidCursorError, decode_cursor, decode_keyset_cursor, encode_cursor, keyset_page
+)
+from core.result_store import (
+    ColumnarResultReader, ColumnarResultWriter, ResultStoreError, commit_staged_results, open_batch_results,
+    staging_path
+)
 from core.security import require_role
-from schemas.batch_predict import BatchUploadResponse, BatchResultsResponse, BatchPredictionResult
-import pandas as pd
+from core.config import settings
+from schemas.batch_predict import (
+    BatchUploadResponse, BatchResultsResponse, BatchPredictionResult, BatchJobResponse, BatchJobStatus
+)
+import asyncio
+import csv
 import io
 import json
+import os
 import logging
-from typing import List
+import re
+from urllib.parse import quote
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Rows per write when streaming results stored as a JSON blob
+DOWNLOAD_STREAM_ROWS = 5000
+
+
+def _attachment_header(filename: str) -> str:
+    """Content-Disposition for a download named after an upload. The plain
+    filename is an ASCII fallback; filename* carries the name as uploaded (RFC 6266)"""
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', "_", filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+async def _reuse_batch_results(
+        db: AsyncSession, content_hash: str, filename: str, user_id: int
+) -> Optional[BatchUploadResponse]:
+    """Answer an upload from the user's own earlier identical batch whose results are still stored"""
+    match = await find_batch_by_content_hash(db, content_hash, user_id)
+    if match is None:
+        return None
+
+    try:
+        reader = await asyncio.to_thread(open_batch_results, match.id)
+        results = await asyncio.to_thread(
+            lambda: scored_batch_records(reader.read(), advice=reader.advice)
+        )
+    except (FileNotFoundError, ResultStoreError) as e:
+        logger.warning(f"Results of batch {match.id} can't be reused, scoring again: {e}")
+        return None
+
+    logger.info(f"Batch file {filename} matches batch {match.id}; reusing its results")
+    return BatchUploadResponse(
+        batch_id=match.id,
+        filename=match.filename,
+        total_records=match.total_records,
+        successful_predictions=match.successful_predictions,
+        failed_predictions=match.failed_predictions,
+        results=results,
+        deduplicated=True
+    )
+
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _summary_line(total: int, successful: int, model_version: Optional[str], **extra) -> str:
+    """Last line of a streamed NDJSON response; its absence means the stream was cut short"""
+    summary = {
+        "total_records": total,
+        "successful_predictions": successful,
+        "failed_predictions": total - successful,
+        "model_version": model_version,
+        **extra
+    }
+    return json.dumps({"summary": summary}) + "\n"
+
+
+class _ChunkQueueSink(ResultSink):
+    """Hands each scored chunk, encoded as NDJSON, to the streaming response.
+    None is queued once the pipeline closes or discards its sinks."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue[Optional[str]]"):
+        self._loop = loop
+        self._queue = queue
+
+    def write(self, scored):
+        if len(scored.valid):
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, scored_batch_ndjson(scored) + "\n")
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+
+
+def _stream_error_message(e: Exception) -> str:
+    import pandas as pd
+
+    if isinstance(e, BatchInputError):
+        return str(e)
+    if isinstance(e, pd.errors.ParserError):
+        return f"CSV parsing error: {str(e)}"
+    return "Internal server error"
+
+
+async def _stream_batch_chunks(
+        first: Optional[str],
+        chunks: "asyncio.Queue[Optional[str]]",
+        scoring: asyncio.Future,
+        staged_path,
+        batch_data: Dict,
+        model_version: str,
+        user_id: int,
+        background_tasks: BackgroundTasks
+) -> AsyncIterator[str]:
+    """Yield chunks as they are scored, then record the batch and yield the summary"""
+    try:
+        text = first
+        while text is not None:
+            yield text
+            text = await chunks.get()
+        try:
+            counts = await scoring
+        except Exception as e:
+            logger.error(f"Streamed batch {batch_data['filename']} failed: {e}")
+            yield json.dumps({"error": _stream_error_message(e)}) + "\n"
+            return
+
+        batch_data.update(
+            total_records=counts["total"],
+            successful_predictions=counts["successful"],
+            failed_predictions=counts["failed"]
+        )
+        # The request's session may be gone by now, so the row gets its own
+        try:
+            async with async_session() as db:
+                db_batch = await create_batch_prediction(db, batch_data, user_id)
+            await asyncio.to_thread(commit_staged_results, staged_path, db_batch.id)
+        except Exception as e:
+            staged_path.unlink(missing_ok=True)
+            logger.error(f"Could not record streamed batch {batch_data['filename']}: {e}")
+            yield json.dumps({"error": "Internal server error"}) + "\n"
+            return
+
+        logger.info(f"Streamed batch complete: {counts['successful']} successful, {counts['failed']} failed")
+        # Runs once the response is finished
+        background_tasks.add_task(persist_batch_predictions_safely, db_batch.id, user_id)
+        yield _summary_line(
+            counts["total"], counts["successful"], model_version,
+            batch_id=db_batch.id, filename=batch_data["filename"]
+        )
+    finally:
+        # Client went away mid-stream: stop scoring, which discards the staged results
+        if not scoring.done():
+            scoring.cancel()
+            await asyncio.gather(scoring, return_exceptions=True)
+
+
+async def _start_streamed_batch(
+        file: UploadFile,
+        content_hash: str,
+        active_models: Dict,
+        include_contributions: bool,
+        user_id: int,
+        background_tasks: BackgroundTasks
+) -> StreamingResponse:
+    loop = asyncio.get_running_loop()
+    chunks: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    staged_path = staging_path()
+    scoring = asyncio.ensure_future(run_batch_pipeline(
+        file.file,
+        TeeSink(_ChunkQueueSink(loop, chunks), ColumnarResultWriter(staged_path)),
+        include_contributions=include_contributions,
+        max_rows=settings.BATCH_MAX_ROWS,
+        chunk_rows=settings.BATCH_STREAM_CHUNK_ROWS,
+        models=active_models
+    ))
+    # Wait for the first chunk, so files that fail up front (missing columns,
+    # empty) still get an error status instead of a 200 with an error line
+    try:
+        first = await chunks.get()
+        if first is None:
+            await asyncio.wait({scoring})
+    except BaseException:
+        scoring.cancel()
+        raise
+    if first is None and scoring.exception() is not None:
+        raise scoring.exception()
+
+    batch_data = {"filename": file.filename, "content_hash": content_hash}
+    return StreamingResponse(
+        _stream_batch_chunks(
+            first, chunks, scoring, staged_path, batch_data, active_models["version"], user_id, background_tasks
+        ),
+        media_type="application/x-ndjson",
+        background=background_tasks
+    )
+
+
+def _stream_reused_results(reused: BatchUploadResponse, model_version: str) -> Iterator[str]:
+    for start in range(0, len(reused.results), DOWNLOAD_STREAM_ROWS):
+        yield "".join(json.dumps(record) + "\n" for record in reused.results[start:start + DOWNLOAD_STREAM_ROWS])
+    yield _summary_line(
+        reused.total_records, reused.successful_predictions, model_version,
+        batch_id=reused.batch_id, filename=reused.filename, deduplicated=True
+    )
+
 
 @router.post("/predict-csv", response_model=BatchUploadResponse)
 async def batch_predict_csv(
+        background_tasks: BackgroundTasks,
         file: UploadFile = File(...),
+        include_contributions: bool = False,
+        force: bool = Query(False, description="Score the file even if an identical upload was already scored"),
+        stream: bool = Query(False, description="Stream results as NDJSON while the file is scored"),
         db: AsyncSession = Depends(get_db),
         current_user=Depends(require_role(["doctor"]))
 ):
+    """Score a CSV and return every result. With ?stream=true, results come back
+    as NDJSON chunk by chunk, followed by a summary line with the batch_id."""
     if not file.filename.endswith('.csv'):
         raise HTTPException(400, detail="Only CSV files accepted")
 
-    try:
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+    # Imported on first use so API startup doesn't pay for pandas
+    import pandas as pd
 
-        # Validate CSV structure
-        required_columns = ["sex", "age", "cigsPerDay", "totChol", "sysBP", "diaBP", "glucose"]
-        missing = [col for col in required_columns if col not in df.columns]
-        if missing:
-            raise HTTPException(400, detail=f"Missing required columns: {', '.join(missing)}")
+    MAX_FILE_SIZE = settings.BATCH_MAX_UPLOAD_BYTES
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(400, detail=f"File size exceeds {MAX_FILE_SIZE // (1024 * 1024)}MB limit")
 
-        # Add file size validation (10MB limit)
-        MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(400, detail="File size exceeds 10MB limit")
+    # Every result is returned in the response; larger files should go through /batch/jobs
+    MAX_ROWS = settings.BATCH_MAX_ROWS
 
-        # Add row count validation (reasonable limit)
-        MAX_ROWS = 10000  # Adjust based on your system capacity
-        if len(df) > MAX_ROWS:
-            raise HTTPException(400, detail=f"File contains too many rows. Maximum allowed: {MAX_ROWS}")
+    try:
+        # Identical bytes scored by the same model with the same options give
+        # identical results, so a repeated upload reuses the stored ones
+        active_models = get_models()
+        content_hash = await asyncio.to_thread(
+            csv_content_hash, file.file, active_models["fingerprint"], f"contributions={include_contributions}"
+        )
+        if not force:
+            reused = await _reuse_batch_results(db, content_hash, file.filename, current_user.id)
+            if reused is not None:
+                if stream:
+                    return StreamingResponse(
+                        _stream_reused_results(reused, active_models["version"]), media_type="application/x-ndjson"
+                    )
+                return reused
 
-        logger.info(f"Processing batch file: {file.filename} with {len(df)} records")
+        if stream:
+            return await _start_streamed_batch(
+                file, content_hash, active_models, include_contributions, current_user.id, background_tasks
+            )
 
-        results = batch_predict_cvd_risk(df)
-        successful = len([r for r in results if "error" not in r])
-        failed = len([r for r in results if "error" in r])
+        # Parsed in chunks straight from the spooled upload: no decoded or StringIO copies.
+        # Rows are kept for the response and written to the columnar result store.
+        records = RecordListSink()
+        staged_path = staging_path()
+        counts = await run_batch_pipeline(
+            file.file,
+            TeeSink(records, ColumnarResultWriter(staged_path)),
+            include_contributions=include_contributions,
+            max_rows=MAX_ROWS,
+            models=active_models
+        )
+        results = records.records
+        total_records = counts["total"]
+        successful = counts["successful"]
+        failed = counts["failed"]
 
+        logger.info(f"Processed batch file: {file.filename} with {total_records} records")
         logger.info(f"Batch processing complete: {successful} successful, {failed} failed")
 
         batch_data = {
             "filename": file.filename,
-            "total_records": len(df),
+            "total_records": total_records,
             "successful_predictions": successful,
             "failed_predictions": failed,
-            "results": results
+            "content_hash": content_hash
         }
 
-        db_batch = await create_batch_prediction(db, batch_data, current_user.id)
+        try:
+            db_batch = await create_batch_prediction(db, batch_data, current_user.id)
+            await asyncio.to_thread(commit_staged_results, staged_path, db_batch.id)
+        except Exception:
+            staged_path.unlink(missing_ok=True)
+            raise
+        # Written after the response is sent, so statistics include these rows
+        background_tasks.add_task(persist_batch_predictions_safely, db_batch.id, current_user.id)
 
         # FIXED: Return all results instead of just first 10
         return BatchUploadResponse(
             batch_id=db_batch.id,
             filename=file.filename,
-            total_records=len(df),
+            total_records=total_records,
             successful_predictions=successful,
             failed_predictions=failed,
             results=results  # Return ALL results, not just [:10]
         )
 
+    except HTTPException:
+        raise
+    except BatchInputError as e:
+        raise HTTPException(400, detail=str(e))
     except pd.errors.EmptyDataError:
         raise HTTPException(400, detail="CSV file is empty")
     except pd.errors.ParserError as e:
@@ -85,12 +334,86 @@ async def batch_predict_csv(
         raise HTTPException(500, detail=f"Internal server error: {str(e)}")
 
 
+def _stream_record_scores(matrices: List[np.ndarray], active: Dict, include_contributions: bool) -> Iterator[str]:
+    """Score and encode one chunk of records at a time"""
+    total = successful = 0
+    while matrices:
+        features = matrices.pop(0)
+        scored = score_feature_matrix(
+            features, np.arange(total, total + len(features)), active, include_contributions
+        )
+        total += len(features)
+        successful += int(scored.valid.sum())
+        yield scored_batch_ndjson(scored) + "\n"
+    if total > successful:
+        logger.error(f"{total - successful} of {total} bulk records could not be scored")
+    yield _summary_line(total, successful, active["version"])
+
+
+@router.post("/predict-records")
+async def batch_predict_records(
+        request: Request,
+        include_contributions: bool = False,
+        current_user=Depends(require_role(["doctor"]))
+):
+    """Score feature records sent as a JSON array (or {"patient_data": [...]}) or
+    as NDJSON, one record per line. Results stream back as NDJSON in input order,
+    keyed by row_id (the record's position), followed by one summary line."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type in NDJSON_CONTENT_TYPES:
+            # Parsed into compact feature matrices while the body arrives
+            matrices = await read_ndjson_features(request.stream(), max_rows=settings.BATCH_RECORDS_MAX_ROWS)
+        elif content_type == "application/json":
+            max_bytes = settings.BATCH_RECORDS_MAX_JSON_BYTES
+            body = bytearray()
+            async for data in request.stream():
+                body.extend(data)
+                if len(body) > max_bytes:
+                    raise HTTPException(
+                        413, detail=f"JSON bodies are limited to {max_bytes // (1024 * 1024)}MB; send larger batches as NDJSON"
+                    )
+            matrices = await asyncio.to_thread(
+                json_records_features, bytes(body), settings.BATCH_RECORDS_MAX_ROWS
+            )
+        else:
+            raise HTTPException(415, detail="Send application/json or application/x-ndjson")
+    except HTTPException:
+        raise
+    except BatchInputError as e:
+        raise HTTPException(400, detail=str(e))
+
+    # Pinned so every chunk is scored by the same model version
+    active_models = get_models()
+    logger.info(f"Scoring {sum(len(m) for m in matrices)} bulk records")
+    return StreamingResponse(
+        _stream_record_scores(matrices, active_models, include_contributions),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/history", response_model=List[BatchPredictionResult])
 async def get_batch_history(
+        response: Response,
+        limit: int = Query(settings.BATCH_HISTORY_PAGE_SIZE, ge=1, le=settings.BATCH_HISTORY_MAX_PAGE),
+        cursor: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user=Depends(require_role(["doctor"]))
 ):
-    batch_predictions = await get_user_batch_predictions(db, current_user.id)
+    """Newest batches first; when more remain, X-Next-Cursor holds the ?cursor= for the next page"""
+    before = None
+    if cursor:
+        try:
+            before = decode_keyset_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(400, detail=str(e))
+
+    # One extra row tells whether another page exists
+    batch_predictions, next_cursor = keyset_page(
+        await get_user_batch_predictions(db, current_user.id, limit + 1, before), limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [
         BatchPredictionResult(
             id=bp.id,
@@ -98,33 +421,231 @@ async def get_batch_history(
             total_records=bp.total_records,
             successful_predictions=bp.successful_predictions,
             failed_predictions=bp.failed_predictions,
-            created_at=bp.created_at
+            created_at=bp.created_at,
+            status=bp.status
         )
         for bp in batch_predictions
     ]
 
 
+def _legacy_csv_row(record: Dict) -> Dict:
+    row = {"row_id": record.get("row_id"), "error": record.get("error")}
+    row.update(record.get("features_used") or {})
+    for key in ("probability", "risk_percentage", "risk_category", "risk_color", "model_version",
+                "personalized_advice"):
+        row[key] = record.get(key)
+    for name, value in (record.get("feature_contributions") or {}).items():
+        row[f"contribution_{name}"] = value
+    if "key_factors" in record:
+        row["key_factors"] = ";".join(record["key_factors"])
+    return row
+
+
+def _stream_legacy_results(records: List[Dict], fmt: str) -> Iterator[str]:
+    """Rows stored as a JSON blob before the columnar result store existed"""
+    if fmt == "ndjson":
+        for start in range(0, len(records), DOWNLOAD_STREAM_ROWS):
+            yield "".join(json.dumps(r) + "\n" for r in records[start:start + DOWNLOAD_STREAM_ROWS])
+        return
+
+    include_contributions = any("feature_contributions" in r for r in records)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=batch_csv_columns(include_contributions), lineterminator="\n")
+    writer.writeheader()
+    for start in range(0, len(records), DOWNLOAD_STREAM_ROWS):
+        writer.writerows(_legacy_csv_row(r) for r in records[start:start + DOWNLOAD_STREAM_ROWS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _stream_stored_results(reader: ColumnarResultReader, fmt: str, start: int, stop: Optional[int]) -> Iterator[str]:
+    """Encode one row group at a time, so memory stays flat whatever the batch size"""
+    if fmt == "csv":
+        yield ",".join(batch_csv_columns(reader.has_contributions)) + "\n"
+    for scored in reader.iter_chunks(start, stop):
+        if fmt == "csv":
+            yield scored_batch_csv(scored, advice=reader.advice)
+        elif len(scored.valid):
+            yield scored_batch_ndjson(scored, advice=reader.advice) + "\n"
+
+
 @router.get("/download/{batch_id}", response_model=BatchResultsResponse)
 async def download_batch_results(
         batch_id: int,
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=settings.BATCH_DOWNLOAD_MAX_PAGE),
+        cursor: Optional[str] = None,
+        format: str = Query("json", pattern="^(json|ndjson|csv)$"),
         db: AsyncSession = Depends(get_db),
         current_user=Depends(require_role(["doctor"]))
 ):
-    result = await db.execute(
-        select(BatchPrediction).where(
-            and_(
-                BatchPrediction.id == batch_id,
-                BatchPrediction.user_id == current_user.id
-            )
-        )
-    )
-    batch_prediction = result.scalar_one_or_none()
+    """Batch results as JSON (all rows, or a page with offset/limit or cursor),
+    or streamed as NDJSON or CSV"""
+    return await _batch_results(db, current_user.id, batch_id, offset, limit, cursor, format)
+
+
+@router.get("/jobs/{batch_id}/results", response_model=BatchResultsResponse)
+async def get_job_results(
+        batch_id: int,
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=settings.BATCH_DOWNLOAD_MAX_PAGE),
+        cursor: Optional[str] = None,
+        format: str = Query("json", pattern="^(json|ndjson|csv)$"),
+        db: AsyncSession = Depends(get_db),
+        current_user=Depends(require_role(["doctor"]))
+):
+    """Job results as JSON pages of at most BATCH_DOWNLOAD_MAX_PAGE rows, followed
+    with next_cursor, or streamed whole as NDJSON or CSV"""
+    if format == "json" and limit is None:
+        # Jobs run to millions of rows, too many to build into one response
+        limit = settings.BATCH_DOWNLOAD_MAX_PAGE
+    return await _batch_results(db, current_user.id, batch_id, offset, limit, cursor, format)
+
+
+async def _batch_results(
+        db: AsyncSession,
+        user_id: int,
+        batch_id: int,
+        offset: int,
+        limit: Optional[int],
+        cursor: Optional[str],
+        format: str
+):
+    batch_prediction = await get_batch_prediction(db, batch_id, user_id, include_results=True)
 
     if not batch_prediction:
         raise HTTPException(404, detail="Batch prediction not found")
+    if batch_prediction.status != "completed":
+        raise HTTPException(409, detail=f"Batch job is {batch_prediction.status}; results are not available")
+
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(400, detail=str(e))
+        if position.get("batch") != batch_id or not isinstance(position.get("offset"), int):
+            raise HTTPException(400, detail="Cursor does not belong to this batch")
+        offset = position["offset"]
+    stop = offset + limit if limit else None
+
+    reader = records = None
+    if batch_prediction.results is not None:
+        # Stored before the columnar result store existed
+        records = await asyncio.to_thread(json.loads, batch_prediction.results)
+        total = len(records)
+        records = records[offset:stop]
+    else:
+        try:
+            reader = await asyncio.to_thread(open_batch_results, batch_id)
+        except FileNotFoundError:
+            raise HTTPException(410, detail="Batch results are no longer available")
+        total = reader.rows
+
+    if format != "json":
+        if reader is not None:
+            body = _stream_stored_results(reader, format, offset, stop)
+        else:
+            body = _stream_legacy_results(records, format)
+        stem = os.path.splitext(os.path.basename(batch_prediction.filename))[0].strip() or f"batch-{batch_id}"
+        return StreamingResponse(
+            body,
+            media_type="text/csv" if format == "csv" else "application/x-ndjson",
+            headers={"Content-Disposition": _attachment_header(f"{stem}-results.{format}")}
+        )
+
+    if reader is not None:
+        results = await asyncio.to_thread(
+            lambda: scored_batch_records(reader.read(offset, stop), advice=reader.advice)
+        )
+    else:
+        results = records
 
+    next_offset = offset + len(results)
     return BatchResultsResponse(
         batch_id=batch_id,
         filename=batch_prediction.filename,
-        results=json.loads(batch_prediction.results)
-    )
\ No newline at end of file
+        results=results,
+        total_records=total,
+        offset=offset,
+        next_cursor=encode_cursor({"batch": batch_id, "offset": next_offset}) if limit and next_offset < total else None
+    )
+
+
+def _job_status(job: BatchPrediction) -> BatchJobStatus:
+    total = max(job.total_records, job.processed_records)
+    if job.status == "completed":
+        progress = 1.0
+    else:
+        progress = round(job.processed_records / total, 4) if total else 0.0
+    return BatchJobStatus(
+        job_id=job.id,
+        filename=job.filename,
+        status=job.status,
+        total_records=total,
+        processed_records=job.processed_records,
+        successful_predictions=job.successful_predictions,
+        failed_predictions=job.failed_predictions,
+        progress=progress,
+        error=job.error_message,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at
+    )
+
+
+@router.post("/jobs", response_model=BatchJobResponse, status_code=202)
+async def submit_batch_job(
+        file: UploadFile = File(...),
+        include_contributions: bool = False,
+        db: AsyncSession = Depends(get_db),
+        current_user=Depends(require_role(["doctor"]))
+):
+    """Queue a CSV for background scoring and return its job id straight away"""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(400, detail="Only CSV files accepted")
+
+    import pandas as pd
+
+    MAX_FILE_SIZE = settings.BATCH_JOB_MAX_UPLOAD_BYTES
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(400, detail=f"File size exceeds {MAX_FILE_SIZE // (1024 * 1024)}MB limit")
+
+    # Reject a bad header now rather than in a failed job
+    try:
+        file.file.seek(0)
+        header = pd.read_csv(file.file, nrows=0, encoding="utf-8")
+    except pd.errors.EmptyDataError:
+        raise HTTPException(400, detail="CSV file is empty")
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        raise HTTPException(400, detail="CSV header could not be read. Please ensure file is UTF-8 encoded")
+    missing = [col for col in FEATURE_NAMES if col not in header.columns]
+    if missing:
+        raise HTTPException(400, detail=f"Missing required columns: {', '.join(missing)}")
+
+    upload_path = await asyncio.to_thread(save_job_upload, file.file)
+    try:
+        estimated = await asyncio.to_thread(count_csv_rows, upload_path)
+        job = await create_batch_job(
+            db, current_user.id, file.filename, str(upload_path), estimated, include_contributions
+        )
+    except Exception:
+        os.remove(upload_path)
+        raise
+
+    batch_job_runner.enqueue(job.id)
+    logger.info(f"Queued batch job {job.id}: {file.filename} with ~{estimated} records")
+    return BatchJobResponse(job_id=job.id, filename=job.filename, status=job.status, estimated_records=estimated)
+
+
+@router.get("/jobs/{job_id}", response_model=BatchJobStatus)
+async def get_batch_job_status(
+        job_id: int,
+        db: AsyncSession = Depends(get_db),
+        current_user=Depends(require_role(["doctor"]))
+):
+    job = await get_batch_prediction(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(404, detail="Batch job not found")
+    return _job_status(job)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from uuid import uuid4
 import logging
 import sys
@@ -17,7 +17,8 @@ from db.crud import (
 )
 from schemas.chat import ChatMessage, ChatResponse, ChatHistory, ChatSessionInfo
 from core.security import get_current_user
-from utils.chatbot import ChatbotService
+from core.config import settings
+from core.pagination import InvalidCursorError, decode_keyset_cursor, keyset_page
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -31,8 +32,11 @@ logger.addHandler(handler)
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
 
-# Global chatbot instance (shared from lifespan in main.py)
-chatbot: Optional[ChatbotService] = None
+if TYPE_CHECKING:
+    from utils.chatbot import ChatbotService
+
+# Global chatbot instance, created on the first message so startup skips the LLM client import
+chatbot: Optional["ChatbotService"] = None
 
 @router.post("/message", response_model=ChatResponse)
 @limiter.limit("5/minute")
@@ -47,6 +51,7 @@ async def send_message(
     if chatbot is None:
         logger.warning("Chatbot not initialized -- initializing now")
         try:
+            from utils.chatbot import ChatbotService
             chatbot = ChatbotService()
             logger.info("✅ Chatbot initialized during request")
         except Exception as e:
@@ -119,10 +124,19 @@ async def send_message(
 @router.get("/history/{session_id}", response_model=ChatHistory)
 async def get_session_history(
         session_id: str,
-        limit: int = 50,
+        limit: int = Query(50, ge=1, le=settings.HISTORY_MAX_PAGE),
+        cursor: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
+    """The latest `limit` messages, oldest first; next_cursor pages back to earlier ones"""
+    before = None
+    if cursor:
+        try:
+            before = decode_keyset_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(400, detail=str(e))
+
     try:
         # Check session ownership
         result = await db.execute(
@@ -140,11 +154,13 @@ async def get_session_history(
                 detail="Session not found"
             )
 
-        messages = await get_chat_history(db, session_id, limit)
+        # Fetched newest first so a page is the latest `limit` before the cursor
+        messages, next_cursor = keyset_page(await get_chat_history(db, session_id, limit + 1, before), limit)
         logger.info(f"Retrieved {len(messages)} messages for session: {session_id}")
 
         return ChatHistory(
             session_id=session_id,
+            next_cursor=next_cursor,
             messages=[
                 {
                     "id": msg.id,
@@ -154,9 +170,11 @@ async def get_session_history(
                     "created_at": msg.created_at,
                     "is_user": True if msg.source == "user" else False
                 }
-                for msg in messages
+                for msg in reversed(messages)
             ]
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"History retrieval failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -166,11 +184,26 @@ async def get_session_history(
 
 @router.get("/sessions", response_model=List[ChatSessionInfo])
 async def get_user_sessions(
+        response: Response,
+        limit: int = Query(settings.CHAT_SESSIONS_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE),
+        cursor: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
+    """Most recently updated sessions first; when more remain, X-Next-Cursor holds the ?cursor= for the next page"""
+    before = None
+    if cursor:
+        try:
+            before = decode_keyset_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(400, detail=str(e))
+
     try:
-        sessions = await get_user_chat_sessions(db, current_user.id)
+        sessions, next_cursor = keyset_page(
+            await get_user_chat_sessions(db, current_user.id, limit + 1, before), limit, sort_key="updated_at"
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         logger.info(f"Found {len(sessions)} sessions for user: {current_user.id}")
         return [
             ChatSessionInfo(
@@ -241,9 +274,7 @@ async def rename_session(
 
         old_name = session.session_name
         session.session_name = new_name
-        db.add(session)
         await db.commit()
-        await db.refresh(session)
         logger.info(f"Renamed session {session_id}: {old_name} → {new_name}")
         return {"message": "Session renamed successfully"}
     except Exception as e:
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Optional
+import asyncio
+import logging
+
+from core import model_registry
+from core.model_registry import ModelRegistryError
+from core.model_utils import activate_models, get_model_info, get_models, load_model_version
+from core.security import require_role
+from core.config import settings
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Serializes reloads so two requests can't race each other's swap
+_reload_lock = asyncio.Lock()
+
+
+async def reload_model_version(version: str) -> Dict:
+    """Load a version off the event loop, then swap it in atomically"""
+    async with _reload_lock:
+        if get_models().get("version") == version:
+            return get_model_info()
+        new_models = await asyncio.to_thread(load_model_version, version)
+        activate_models(new_models)
+        return get_model_info()
+
+
+async def watch_active_model_version(interval: float):
+    """Reload whenever models/registry/ACTIVE changes, so every worker follows a rollout"""
+    last_mtime = model_registry.active_pointer_mtime()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            mtime = model_registry.active_pointer_mtime()
+            if mtime is None or mtime == last_mtime:
+                continue
+            last_mtime = mtime
+            version = model_registry.get_active_version()
+            if version:
+                await reload_model_version(version)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Model watcher failed to reload: {e}", exc_info=True)
+
+
+@router.get("/", response_model=Dict)
+async def get_models_status(current_user=Depends(require_role(["admin", "doctor"]))):
+    return get_model_info()
+
+
+@router.post("/reload", response_model=Dict)
+async def reload_models(
+        version: Optional[str] = None,
+        current_user=Depends(require_role(["admin"]))
+):
+    """Activate a registered version (default: the newest) in this worker and
+    repoint ACTIVE so the other workers' watchers follow"""
+    # The admin role comes from self-registration, so activation, which changes
+    # every worker's model, also needs an operator listed in the deploy settings
+    if current_user.email not in settings.MODEL_OPERATOR_EMAILS:
+        logger.warning(f"Model reload refused for user {current_user.id}: not a model operator")
+        raise HTTPException(403, detail="Only model operators can activate model versions")
+    try:
+        if not version:
+            versions = model_registry.list_versions()
+            if not versions:
+                raise HTTPException(404, detail="No registered model versions")
+            version = versions[-1]["version"]
+        info = await reload_model_version(version)
+        await asyncio.to_thread(model_registry.set_active_version, version)
+        logger.info(f"Model version {version} activated by user {current_user.id}")
+        return info
+    except ModelRegistryError as e:
+        raise HTTPException(400, detail=str(e))
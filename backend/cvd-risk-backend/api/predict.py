@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from db.crud import create_prediction, get_user_predictions
 from schemas.predict import PredictionInput, PredictionOutput, PredictionHistory
-from core.model_utils import predict_cvd_risk
+from core.model_utils import build_prediction_result, prediction_cache
+from core.micro_batcher import micro_batcher
+from core.config import settings
+from core.pagination import InvalidCursorError, decode_keyset_cursor, keyset_page
 from core.security import get_current_user
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 import logging
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -34,10 +37,16 @@ async def predict_single(
             prediction_input.glucose
         ]
 
-        result = predict_cvd_risk(features, {
+        user_data = {
             "user_id": current_user.id,
             "role": current_user.role
-        })
+        }
+        result = prediction_cache.get(features, user_data)
+        if result is None:
+            # Concurrent requests are coalesced into one scoring call
+            probability, contributions, model_version = await micro_batcher.submit(features)
+            result = build_prediction_result(features, probability, user_data, model_version, contributions)
+            prediction_cache.put(features, user_data, result)
 
         prediction_data = prediction_input.model_dump()
         prediction_data.update(result)
@@ -56,11 +65,25 @@ async def predict_single(
 
 @router.get("/history", response_model=List[PredictionHistory])
 async def get_prediction_history(
-        limit: int = 10,
+        response: Response,
+        limit: int = Query(10, ge=1, le=settings.HISTORY_MAX_PAGE),
+        cursor: Optional[str] = None,
         db: AsyncSession = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
-    predictions = await get_user_predictions(db, current_user.id, limit)
+    """Newest predictions first; when more remain, X-Next-Cursor holds the ?cursor= for the next page"""
+    before = None
+    if cursor:
+        try:
+            before = decode_keyset_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(400, detail=str(e))
+
+    predictions, next_cursor = keyset_page(
+        await get_user_predictions(db, current_user.id, limit + 1, before), limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [
         PredictionHistory(
             id=prediction.id,
@@ -0,0 +1,499 @@
+"""
+Inference benchmarks for the CVD risk model.
+
+Usage:
+    python benchmark.py kernel [--calls N]
+    python benchmark.py memory [--workers N]
+    python benchmark.py imports [--top N]
+    python benchmark.py pipeline [--rows N] [--chunk-rows N]
+    python benchmark.py storage [--rows N] [--contributions]
+    python benchmark.py shards [--rows N] [--workers 1 2 4 8] [--contributions]
+    python benchmark.py records [--rows N] [--contributions]
+    python benchmark.py persist [--rows N] [--per-row N] [--database-url URL]
+"""
+import argparse
+import asyncio
+import os
+import re
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import urllib.request
+
+import numpy as np
+
+from core.model_utils import build_prediction_result, load_models, get_models, score_versioned
+from core.validation import FEATURE_RULES
+
+# Same bounds as schemas.predict.PredictionInput
+FEATURE_BOUNDS = [(rule.minimum, rule.maximum) for rule in FEATURE_RULES]
+
+
+def random_features(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    low, high = np.array(FEATURE_BOUNDS, dtype=np.float64).T
+    features = rng.uniform(low, high, size=(n, len(FEATURE_BOUNDS)))
+    features[:, :3] = np.round(features[:, :3])  # sex, age and cigsPerDay are integers
+    return features
+
+
+def sklearn_predict_proba(features: np.ndarray) -> np.ndarray:
+    models = get_models()
+    features_scaled = models["scaler"].transform(features)
+    return models["classifier"].predict_proba(features_scaled)[:, 1]
+
+
+def score_one(row):
+    """What /predict/single does for a cache miss arriving alone in its micro-batch"""
+    probabilities, contributions, version = score_versioned(np.array([row], dtype=np.float64))
+    return build_prediction_result(row, float(probabilities[0]), None, version, contributions[0].tolist())
+
+
+def bench_kernel(calls: int):
+    models = get_models()
+    kernel = models["kernel"]
+    if kernel is None:
+        raise SystemExit("Fused kernel unavailable for the loaded models")
+
+    # Parity with sklearn is checked by tests/test_fused_kernel.py
+    features = random_features(1)
+    row = features[0].tolist()
+    row_array = features[:1]
+    timings = {
+        "sklearn transform+predict_proba": lambda: sklearn_predict_proba(row_array),
+        "kernel.predict_proba (1 row)": lambda: kernel.predict_proba(row_array),
+        "score_one (kernel)": lambda: score_one(row),
+    }
+    for name, fn in timings.items():
+        best = min(timeit.repeat(fn, number=calls, repeat=5)) / calls
+        print(f"{name:<34} {best * 1e6:8.2f} us/call")
+
+    models["kernel"] = None
+    try:
+        best = min(timeit.repeat(lambda: score_one(row), number=calls, repeat=5)) / calls
+        print(f"{'score_one (sklearn)':<34} {best * 1e6:8.2f} us/call")
+    finally:
+        models["kernel"] = kernel
+
+
+def _children(pid: int):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; the command name may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _memory_kb(pid: int) -> dict:
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                usage[parts[0][:-1]] = int(parts[1])
+    usage["Private"] = usage.pop("Private_Clean", 0) + usage.pop("Private_Dirty", 0)
+    return usage
+
+
+def _measure_server(label: str, command: list, env: dict, port: int, workers: int):
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/api/status", timeout=1)
+                if len(_children(server.pid)) >= workers:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.5)
+        time.sleep(2)  # let every worker finish its lifespan startup
+
+        master = _memory_kb(server.pid)
+        print(f"{label}: master Rss={master['Rss'] / 1024:.1f}MB")
+        for pid in _children(server.pid):
+            usage = _memory_kb(pid)
+            print(f"  worker {pid}: Rss={usage['Rss'] / 1024:.1f}MB "
+                  f"Pss={usage['Pss'] / 1024:.1f}MB Private={usage['Private'] / 1024:.1f}MB")
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def bench_memory(workers: int):
+    """Per-worker memory for plain uvicorn workers vs the preloaded gunicorn mode.
+
+    Pss splits shared pages between the processes mapping them, and Private is
+    what each extra worker really costs.
+    """
+    env = dict(os.environ, MODEL_WATCH_INTERVAL_SECONDS="0")
+    _measure_server(
+        "uvicorn --workers (each worker loads its own models)",
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", "8101", "--workers", str(workers)],
+        dict(env, PRELOAD_MODELS="false"), 8101, workers
+    )
+    _measure_server(
+        "gunicorn preload (models loaded before fork)",
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        dict(env, PRELOAD_MODELS="true", BIND="127.0.0.1:8102", WEB_CONCURRENCY=str(workers)), 8102, workers
+    )
+
+
+def bench_imports(top: int):
+    """`python -X importtime -c "import main"`, summarized by top-level package"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+
+    self_us = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if not match:
+            continue
+        package = match.group(4).split(".")[0]
+        self_us[package] = self_us.get(package, 0) + int(match.group(1))
+        if len(match.group(3)) == 1:  # top-level import: cumulative time includes its children
+            total_us += int(match.group(2))
+
+    print(f"import main: {total_us / 1000:.1f} ms total")
+    for package, us in sorted(self_us.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<24} {us / 1000:8.1f} ms")
+    for heavy in ("pandas", "sklearn", "scipy", "groq"):
+        print(f"  {heavy} imported at startup: {'yes' if heavy in self_us else 'no'}")
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_feature_csv(path: str, rows: int, bad_fraction: float = 0.01, block: int = 100000):
+    """Random in-range rows, with a fraction of cells blanked to exercise the error path"""
+    import pandas as pd
+    from core.model_utils import FEATURE_NAMES
+
+    for start in range(0, rows, block):
+        n = min(block, rows - start)
+        frame = pd.DataFrame(random_features(n, seed=start), columns=FEATURE_NAMES)
+        frame.iloc[:, :3] = frame.iloc[:, :3].astype(int)
+        bad = np.random.default_rng(start).random(n) < bad_fraction
+        frame.loc[bad, "glucose"] = np.nan
+        frame.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def bench_pipeline(rows: int, chunk_rows: int):
+    from core.batch_pipeline import ResultSink, run_batch_pipeline
+    from core.result_store import ColumnarResultWriter
+    from core.executor import inference_executor
+
+    class CountingSink(ResultSink):
+        def write(self, scored):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "rows.csv")
+        started = time.perf_counter()
+        write_feature_csv(csv_path, rows)
+        print(f"wrote {rows} rows ({os.path.getsize(csv_path) / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
+        baseline_rss = _peak_rss_mb()
+
+        sinks = {
+            "parse + score": lambda: CountingSink(),
+            "parse + score + columnar sink": lambda: ColumnarResultWriter(os.path.join(tmp, "results.cvdr")),
+        }
+        for label, make_sink in sinks.items():
+            started = time.perf_counter()
+            counts = asyncio.run(run_batch_pipeline(csv_path, make_sink(), chunk_rows=chunk_rows))
+            elapsed = time.perf_counter() - started
+            print(f"{label:<32} {counts['total'] / elapsed:>10,.0f} rows/s  "
+                  f"({elapsed:.2f}s, {counts['failed']} failed rows, peak RSS {_peak_rss_mb():.0f} MB)")
+        print(f"peak RSS before scoring: {baseline_rss:.0f} MB")
+
+    inference_executor.shutdown()
+
+
+def bench_storage(rows: int, contributions: bool):
+    """JSON Text blob vs the columnar result store: size, write and read latency"""
+    import json
+    import pandas as pd
+    from core.model_utils import FEATURE_NAMES, score_batch_frame, scored_batch_records
+    from core.result_store import ColumnarResultReader, ColumnarResultWriter
+
+    chunk_rows = 5000
+    features = random_features(rows)
+    features[np.random.default_rng(1).random(rows) < 0.01, 6] = np.nan
+    chunks = [
+        score_batch_frame(pd.DataFrame(features[start:start + chunk_rows], columns=FEATURE_NAMES,
+                                       index=range(start, min(start + chunk_rows, rows))),
+                          include_contributions=contributions)
+        for start in range(0, rows, chunk_rows)
+    ]
+    records = [record for chunk in chunks for record in scored_batch_records(chunk)]
+
+    started = time.perf_counter()
+    blob = json.dumps(records)
+    json_write = time.perf_counter() - started
+    started = time.perf_counter()
+    json.loads(blob)
+    json_read = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.cvdr")
+        started = time.perf_counter()
+        writer = ColumnarResultWriter(path)
+        for chunk in chunks:
+            writer.write(chunk)
+        writer.close()
+        columnar_write = time.perf_counter() - started
+        size = os.path.getsize(path)
+
+        started = time.perf_counter()
+        reader = ColumnarResultReader(path)
+        decoded = scored_batch_records(reader.read(), advice=reader.advice)
+        columnar_read = time.perf_counter() - started
+        assert decoded == records, "columnar round trip changed the results"
+
+        # Streamed download: one row group decoded and encoded at a time
+        from core.model_utils import scored_batch_csv, scored_batch_ndjson
+        stream_timings = {}
+        for label, encode in (("NDJSON", scored_batch_ndjson), ("CSV", scored_batch_csv)):
+            started = time.perf_counter()
+            streamed = sum(len(encode(chunk, advice=reader.advice)) for chunk in reader.iter_chunks())
+            stream_timings[label] = (time.perf_counter() - started, streamed)
+        tracemalloc.start()
+        for chunk in reader.iter_chunks():
+            scored_batch_ndjson(chunk, advice=reader.advice)
+        stream_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        page = 100
+        middle = rows // 2
+        timing = min(timeit.repeat(lambda: scored_batch_records(ColumnarResultReader(path).read(middle, middle + page)),
+                                   number=20, repeat=3)) / 20
+
+    print(f"{rows} rows, contributions={contributions}; round trip identical")
+    print(f"{'':<22}{'size':>12}{'write':>10}{'read all':>10}")
+    print(f"{'JSON Text column':<22}{len(blob) / 1e6:>10.1f}MB{json_write:>9.2f}s{json_read:>9.2f}s")
+    print(f"{'columnar store':<22}{size / 1e6:>10.1f}MB{columnar_write:>9.2f}s{columnar_read:>9.2f}s")
+    print(f"size ratio {len(blob) / size:.0f}x; reading {page} rows from the middle: {timing * 1000:.2f} ms")
+    for label, (elapsed, streamed) in stream_timings.items():
+        print(f"streamed {label:<6} {rows / elapsed:>10,.0f} rows/s ({streamed / 1e6:.0f} MB)")
+    print(f"peak Python allocations while streaming all rows: {stream_peak / 1e6:.1f} MB")
+
+
+def bench_shards(rows: int, worker_counts: list, contributions: bool):
+    """Background job pipeline (parse, score, columnar store) at several shard worker counts"""
+    from core.batch_pipeline import run_batch_pipeline
+    from core.result_store import ColumnarResultReader, ColumnarResultWriter
+    from core.sharded_scoring import ShardedScorer
+    from core.config import settings
+
+    print(f"{os.cpu_count()} CPUs available; {rows} rows, contributions={contributions}")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "rows.csv")
+        write_feature_csv(csv_path, rows)
+
+        baseline = reference = None
+        for workers in worker_counts:
+            scorer = ShardedScorer(workers, settings.BATCH_SHARD_ROWS)
+            path = os.path.join(tmp, f"results-{workers}.cvdr")
+            if scorer.enabled:
+                # Spawn the pool outside the timing
+                asyncio.run(scorer.score(np.zeros((workers, 7)), np.arange(workers), get_models()))
+            started = time.perf_counter()
+            counts = asyncio.run(run_batch_pipeline(
+                csv_path, ColumnarResultWriter(path), include_contributions=contributions, scorer=scorer
+            ))
+            elapsed = time.perf_counter() - started
+            scorer.shutdown()
+
+            scored = ColumnarResultReader(path).read()
+            if reference is None:
+                reference = scored
+            else:
+                assert np.array_equal(scored.row_ids, reference.row_ids), "rows out of order"
+                assert np.array_equal(scored.probabilities, reference.probabilities), "scores differ"
+            rate = counts["total"] / elapsed
+            baseline = baseline or rate
+            print(f"{workers} worker{'s' if workers != 1 else ' '} {rate:>12,.0f} rows/s  {elapsed:6.2f}s  "
+                  f"speedup {rate / baseline:.2f}x")
+    print("results identical and in row order for every worker count")
+
+
+def bench_records(rows: int, contributions: bool):
+    """Bulk JSON scoring: NDJSON body -> feature matrices -> scores -> NDJSON response,
+    against validating and scoring one record at a time as /predict/single does"""
+    import json
+    from api.batch_predict import _stream_record_scores
+    from core.batch_pipeline import read_ndjson_features
+    from core.model_utils import FEATURE_NAMES
+    from schemas.predict import PredictionInput
+
+    # Measurements to one decimal place, as an EHR export sends them
+    features = random_features(rows)
+    features[:, 3:] = np.round(features[:, 3:], 1)
+    records = [dict(zip(FEATURE_NAMES, row)) for row in features.tolist()]
+    for record in records:
+        for name in ("sex", "age", "cigsPerDay"):
+            record[name] = int(record[name])
+    for record in records[::100]:
+        record["glucose"] = None  # Exercise the error path
+    body = "".join(json.dumps(record) + "\n" for record in records).encode()
+
+    async def receive():
+        # Arrives in request-sized pieces, as from request.stream()
+        for start in range(0, len(body), 64 * 1024):
+            yield body[start:start + 64 * 1024]
+
+    active = get_models()
+    started = time.perf_counter()
+    matrices = asyncio.run(read_ndjson_features(receive(), max_rows=rows))
+    parsed = time.perf_counter()
+    response = sum(len(part) for part in _stream_record_scores(matrices, active, contributions))
+    elapsed = time.perf_counter() - started
+
+    sample = [record for record in records[:5000] if record["glucose"] is not None]
+    single_started = time.perf_counter()
+    for record in sample:
+        validated = PredictionInput(**record)
+        score_one([getattr(validated, name) for name in FEATURE_NAMES])
+    single = (time.perf_counter() - single_started) / len(sample)
+
+    print(f"{rows} records ({len(body) / 1e6:.1f} MB NDJSON in, {response / 1e6:.1f} MB out), "
+          f"contributions={contributions}")
+    print(f"parse          {rows / (parsed - started):>12,.0f} records/s")
+    print(f"score + encode {rows / (elapsed - parsed + started):>12,.0f} records/s")
+    print(f"end to end     {rows / elapsed:>12,.0f} records/s  {elapsed:6.2f}s")
+    print(f"one at a time  {1 / single:>12,.0f} records/s  ({len(sample)} records)")
+
+
+def bench_persist(rows: int, per_row: int, database_url: str):
+    """Batch rows into the predictions table: bulk executemany in one transaction
+    vs crud.create_prediction (INSERT, commit and refresh) per row"""
+    from sqlalchemy import delete
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from core.model_utils import score_feature_matrix, scored_prediction_data
+    from db.crud import bulk_create_predictions, create_prediction
+    from db.database import Base, connect_args
+    from db.models import Prediction, User
+
+    scored = score_feature_matrix(random_features(rows), np.arange(rows), get_models())
+    predictions = scored_prediction_data(scored)
+
+    async def run(url: str):
+        engine = create_async_engine(url, connect_args=connect_args(url))
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            user = User(email=f"benchmark-{os.getpid()}@example.com", hashed_password="-", full_name="Benchmark")
+            db.add(user)
+            await db.commit()
+        try:
+            async with session_factory() as db:
+                started = time.perf_counter()
+                for data in predictions[:per_row]:
+                    await create_prediction(db, data, user.id)
+                single = (time.perf_counter() - started) / per_row
+
+            async with session_factory() as db:
+                started = time.perf_counter()
+                inserted = await bulk_create_predictions(db, predictions, user.id)
+                await db.commit()
+                bulk = time.perf_counter() - started
+        finally:
+            async with session_factory() as db:
+                await db.execute(delete(Prediction).where(Prediction.user_id == user.id))
+                await db.execute(delete(User).where(User.id == user.id))
+                await db.commit()
+            await engine.dispose()
+        return single, inserted, bulk
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'benchmark.db')}"
+        single, inserted, bulk = asyncio.run(run(url))
+    print(f"{url.split('://')[0]}: {inserted} of {rows} rows scored successfully")
+    print(f"create_prediction per row  {1 / single:>10,.0f} rows/s  ({per_row} rows)")
+    print(f"bulk executemany           {inserted / bulk:>10,.0f} rows/s  {bulk:6.2f}s")
+    print(f"speedup {single * inserted / bulk:.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    kernel_parser = subparsers.add_parser("kernel", help="Fused kernel parity and per-call latency")
+    kernel_parser.add_argument("--calls", type=int, default=2000)
+
+    memory_parser = subparsers.add_parser("memory", help="Per-worker RSS with and without preloading")
+    memory_parser.add_argument("--workers", type=int, default=2)
+
+    imports_parser = subparsers.add_parser("imports", help="Startup import time report (-X importtime)")
+    imports_parser.add_argument("--top", type=int, default=15)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Chunked CSV scoring throughput in rows/sec")
+    pipeline_parser.add_argument("--rows", type=int, default=1_000_000)
+    pipeline_parser.add_argument("--chunk-rows", type=int, default=None)
+
+    storage_parser = subparsers.add_parser("storage", help="JSON blob vs columnar batch result storage")
+    storage_parser.add_argument("--rows", type=int, default=100_000)
+    storage_parser.add_argument("--contributions", action="store_true")
+
+    shards_parser = subparsers.add_parser("shards", help="Sharded multi-process job scoring, scaling by worker count")
+    shards_parser.add_argument("--rows", type=int, default=2_000_000)
+    shards_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    shards_parser.add_argument("--contributions", action="store_true")
+
+    records_parser = subparsers.add_parser("records", help="Bulk JSON/NDJSON record scoring in records/sec")
+    records_parser.add_argument("--rows", type=int, default=500_000)
+    records_parser.add_argument("--contributions", action="store_true")
+
+    persist_parser = subparsers.add_parser("persist", help="Bulk vs per-row inserts of batch rows into predictions")
+    persist_parser.add_argument("--rows", type=int, default=200_000)
+    persist_parser.add_argument("--per-row", type=int, default=2000, help="Rows inserted one at a time")
+    persist_parser.add_argument("--database-url", default="", help="Async SQLAlchemy URL; a temporary SQLite file by default")
+
+    args = parser.parse_args()
+
+    if args.command == "kernel":
+        load_models()
+        bench_kernel(args.calls)
+    elif args.command == "memory":
+        bench_memory(args.workers)
+    elif args.command == "imports":
+        bench_imports(args.top)
+    elif args.command == "pipeline":
+        load_models()
+        bench_pipeline(args.rows, args.chunk_rows)
+    elif args.command == "storage":
+        load_models()
+        bench_storage(args.rows, args.contributions)
+    elif args.command == "shards":
+        load_models()
+        bench_shards(args.rows, args.workers, args.contributions)
+    elif args.command == "records":
+        load_models()
+        bench_records(args.rows, args.contributions)
+    elif args.command == "persist":
+        load_models()
+        bench_persist(args.rows, args.per_row, args.database_url)
+
+
+if __name__ == "__main__":
+    main()
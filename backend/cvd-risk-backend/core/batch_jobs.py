@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Set, Union
+
+from core.batch_pipeline import BatchInputError, run_batch_pipeline
+from core.config import settings
+from core.result_store import ColumnarResultWriter, open_batch_results, result_path
+from core.sharded_scoring import sharded_scorer
+
+logger = logging.getLogger(__name__)
+
+
+def count_csv_rows(path: Union[str, Path]) -> int:
+    """Cheap data-row estimate for progress reporting; quoted newlines can skew it"""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(0, lines - 1)
+
+
+def _job_dir() -> Path:
+    if settings.BATCH_JOB_DIR:
+        return Path(settings.BATCH_JOB_DIR)
+    return Path(os.path.dirname(os.path.abspath(__file__))).parent / "batch_jobs"
+
+
+def save_job_upload(upload: BinaryIO) -> Path:
+    """Copy a spooled upload to the job directory, which must outlive the request"""
+    job_dir = _job_dir()
+    job_dir.mkdir(parents=True, exist_ok=True)
+    path = job_dir / f"{uuid.uuid4().hex}.csv"
+    upload.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload, f, 1024 * 1024)
+    return path
+
+
+def _remove_file(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+async def persist_batch_predictions(batch_id: int, user_id: int) -> int:
+    """Copy a scored batch's successful rows from the result store into the
+    predictions table, chunk by chunk in a single transaction. Any rows from an
+    earlier attempt are replaced. Returns the rows written."""
+    from core.model_utils import scored_prediction_data
+    from db.crud import bulk_create_predictions, delete_batch_row_predictions
+    from db.database import async_session
+
+    if not settings.BATCH_PERSIST_PREDICTIONS:
+        return 0
+    reader = await asyncio.to_thread(open_batch_results, batch_id)
+    chunks = reader.iter_chunks()
+    inserted = 0
+    async with async_session() as db:
+        try:
+            await delete_batch_row_predictions(db, batch_id)
+            while True:
+                scored = await asyncio.to_thread(next, chunks, None)
+                if scored is None:
+                    break
+                predictions = await asyncio.to_thread(scored_prediction_data, scored)
+                inserted += await bulk_create_predictions(db, predictions, user_id, batch_id=batch_id)
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+    logger.info(f"Persisted {inserted} rows of batch {batch_id} as predictions")
+    return inserted
+
+
+async def persist_batch_predictions_safely(batch_id: int, user_id: int):
+    """persist_batch_predictions for callers that have already reported success"""
+    try:
+        await persist_batch_predictions(batch_id, user_id)
+    except Exception as e:
+        logger.error(f"Could not persist rows of batch {batch_id} as predictions: {e}", exc_info=True)
+
+
+class BatchJobRunner:
+    """Background workers that score queued batch uploads.
+
+    Jobs are claimed with a conditional UPDATE so several server processes can
+    share one queue table. A running job heartbeats after every chunk; if its
+    process dies the sweeper re-queues it once the heartbeat goes stale, and the
+    job restarts from its saved upload (or fails if the upload is gone).
+    """
+
+    def __init__(self, workers: int, sweep_interval: float, stale_after: float):
+        self.workers = workers
+        self.sweep_interval = sweep_interval
+        self.stale_after = stale_after
+        self._queue: "asyncio.Queue[int]" = asyncio.Queue()
+        self._pending: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._completed = 0
+        self._failed = 0
+
+    def _stale_before(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.stale_after)
+
+    def start(self):
+        if self._tasks or self.workers <= 0:
+            return
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep_forever()))
+        logger.info(f"Batch job runner started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, job_id: int):
+        if job_id not in self._pending:
+            self._pending.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def sweep(self):
+        """Queue every job that is waiting, or was orphaned by a dead worker"""
+        from db.crud import get_pending_batch_job_ids
+        from db.database import async_session
+
+        async with async_session() as db:
+            job_ids = await get_pending_batch_job_ids(db, self._stale_before())
+        for job_id in job_ids:
+            self.enqueue(job_id)
+
+    async def _sweep_forever(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Batch job sweep failed: {e}", exc_info=True)
+            await asyncio.sleep(self.sweep_interval)
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Batch job {job_id} crashed worker {index}: {e}", exc_info=True)
+            finally:
+                self._pending.discard(job_id)
+                self._queue.task_done()
+
+    async def run_job(self, job_id: int):
+        from db.crud import claim_batch_job, complete_batch_job, fail_batch_job, update_batch_job_progress
+        from db.database import async_session
+        from db.models import BatchPrediction
+
+        async with async_session() as db:
+            if not await claim_batch_job(db, job_id, self._stale_before()):
+                return
+            job = await db.get(BatchPrediction, job_id)
+            upload_path = job.upload_path
+
+            if not upload_path or not os.path.exists(upload_path):
+                logger.error(f"Batch job {job_id} failed: upload is missing")
+                await fail_batch_job(db, job_id, "Uploaded file is no longer available; please upload it again")
+                self._failed += 1
+                return
+
+            async def report_progress(processed: int, successful: int, failed: int):
+                await update_batch_job_progress(db, job_id, processed, successful, failed)
+
+            logger.info(f"Running batch job {job_id} ({job.filename})")
+            try:
+                # Results stream to the columnar store, so memory stays bounded by the chunk size
+                counts = await run_batch_pipeline(
+                    upload_path,
+                    ColumnarResultWriter(result_path(job_id)),
+                    include_contributions=job.include_contributions,
+                    max_rows=settings.BATCH_JOB_MAX_ROWS,
+                    on_chunk=report_progress,
+                    scorer=sharded_scorer
+                )
+            except asyncio.CancelledError:
+                # Shutting down: leave the job running so the stale sweep resumes it
+                raise
+            except Exception as e:
+                message = self._describe_error(e)
+                logger.error(f"Batch job {job_id} failed: {message}")
+                await db.rollback()
+                await fail_batch_job(db, job_id, message)
+                _remove_file(upload_path)
+                self._failed += 1
+                return
+
+            await complete_batch_job(db, job_id, counts["total"], counts["successful"], counts["failed"])
+            _remove_file(upload_path)
+            await persist_batch_predictions_safely(job_id, job.user_id)
+            self._completed += 1
+            logger.info(f"Batch job {job_id} complete: {counts['successful']} successful, {counts['failed']} failed")
+
+    @staticmethod
+    def _describe_error(e: Exception) -> str:
+        import pandas as pd
+
+        if isinstance(e, BatchInputError):
+            return str(e)
+        if isinstance(e, pd.errors.EmptyDataError):
+            return "CSV file is empty"
+        if isinstance(e, pd.errors.ParserError):
+            return f"CSV parsing error: {str(e)}"
+        if isinstance(e, UnicodeDecodeError):
+            return "File encoding error. Please ensure file is UTF-8 encoded"
+        return f"Internal error: {str(e)}"
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "queued": self._queue.qsize(),
+            "pending": len(self._pending),
+            "completed": self._completed,
+            "failed": self._failed
+        }
+
+
+batch_job_runner = BatchJobRunner(
+    workers=settings.BATCH_JOB_WORKERS,
+    sweep_interval=settings.BATCH_JOB_SWEEP_SECONDS,
+    stale_after=settings.BATCH_JOB_STALE_SECONDS
+)
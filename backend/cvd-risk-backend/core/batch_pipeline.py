@@ -0,0 +1,327 @@
+import asyncio
+import codecs
+import hashlib
+import json
+import logging
+import math
+from operator import itemgetter
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from core.config import settings
+from core.executor import inference_executor
+from core.model_utils import (
+    FEATURE_NAMES, ScoredBatch, batch_feature_matrix, get_models, score_batch_frame, scored_batch_records
+)
+
+if TYPE_CHECKING:
+    from core.sharded_scoring import ShardedScorer
+
+logger = logging.getLogger(__name__)
+
+class BatchInputError(ValueError):
+    """The uploaded CSV or records can't be scored (missing columns, too many rows)"""
+
+
+class ResultSink:
+    """Receives scored chunks in file order. `write` runs in a worker thread."""
+
+    # Set by sinks that store columnar row groups, so sharded scoring encodes
+    # them in its worker processes and hands them to `write_encoded`
+    accepts_encoded_groups = False
+
+    def write(self, scored: ScoredBatch):
+        raise NotImplementedError
+
+    def write_encoded(self, scored: ScoredBatch, groups: List):
+        """A chunk plus its row groups already encoded, one per shard"""
+        self.write(scored)
+
+    def close(self):
+        pass
+
+    def discard(self):
+        """Called instead of `close` when the pipeline fails"""
+        self.close()
+
+
+class TeeSink(ResultSink):
+    """Fans every chunk out to several sinks"""
+
+    def __init__(self, *sinks: ResultSink):
+        self.sinks = sinks
+        self.accepts_encoded_groups = any(sink.accepts_encoded_groups for sink in sinks)
+
+    def write(self, scored: ScoredBatch):
+        for sink in self.sinks:
+            sink.write(scored)
+
+    def write_encoded(self, scored: ScoredBatch, groups: List):
+        for sink in self.sinks:
+            sink.write_encoded(scored, groups)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def discard(self):
+        for sink in self.sinks:
+            sink.discard()
+
+
+class RecordListSink(ResultSink):
+    """Keeps every result dict in memory, for responses that return them all"""
+
+    def __init__(self):
+        self.records: List[Dict] = []
+
+    def write(self, scored: ScoredBatch):
+        self.records.extend(scored_batch_records(scored))
+
+
+def csv_content_hash(source: BinaryIO, *salts: str) -> str:
+    """SHA-256 of a CSV upload's normalised bytes plus `salts`.
+
+    A BOM, CRLF or CR line endings and trailing blank lines don't change the
+    rows pandas reads, so they don't change the hash either.
+    """
+    digest = hashlib.sha256()
+    for salt in salts:
+        digest.update(salt.encode() + b"\0")
+
+    source.seek(0)
+    first = True
+    carry_cr = False
+    trailing = b""
+    for block in iter(lambda: source.read(1024 * 1024), b""):
+        if first:
+            block = block.removeprefix(codecs.BOM_UTF8)
+            first = False
+        if carry_cr:
+            block = b"\r" + block
+        # A CRLF may straddle two blocks
+        carry_cr = block.endswith(b"\r")
+        if carry_cr:
+            block = block[:-1]
+        block = trailing + block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        # Newlines are held back until more data follows them
+        body = block.rstrip(b"\n")
+        trailing = block[len(body):]
+        digest.update(body)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def _csv_reader(source: Union[str, BinaryIO], chunk_rows: int):
+    import pandas as pd
+
+    return pd.read_csv(source, chunksize=chunk_rows, encoding="utf-8")
+
+
+async def run_batch_pipeline(
+        source: Union[str, BinaryIO],
+        sink: ResultSink,
+        include_contributions: bool = False,
+        max_rows: Optional[int] = None,
+        on_chunk: Optional[Callable[[int, int, int], Awaitable[None]]] = None,
+        chunk_rows: Optional[int] = None,
+        models: Optional[Dict] = None,
+        scorer: Optional["ShardedScorer"] = None
+) -> Dict:
+    """Stream a CSV through reader -> vectorized scorer -> sink, one chunk at a time.
+
+    Parsing the next chunk, scoring the current one and writing the previous one
+    overlap, so at most three chunks are in memory whatever the file size. The
+    model snapshot (`models`, else the active one) is pinned once so a hot
+    reload mid-file can't mix versions. With an enabled `scorer`, each chunk
+    is split into shards scored (and, for columnar sinks, encoded) in parallel.
+    `on_chunk(processed, successful, failed)` is awaited after each chunk.
+    Returns the row counts; raises BatchInputError for files that fail validation.
+    """
+    if scorer is not None and not scorer.enabled:
+        scorer = None
+    if chunk_rows is None:
+        chunk_rows = scorer.chunk_rows if scorer is not None else settings.BATCH_CSV_CHUNK_ROWS
+    try:
+        reader = _csv_reader(source, chunk_rows)
+    except BaseException:
+        # Empty files and undecodable headers fail while the header is read
+        await asyncio.to_thread(sink.discard)
+        raise
+    active_models = models or get_models()
+    processed = successful = 0
+    next_chunk = asyncio.ensure_future(asyncio.to_thread(next, reader, None))
+    pending_write: Optional[asyncio.Future] = None
+
+    try:
+        while True:
+            chunk = await next_chunk
+            if chunk is None:
+                break
+
+            # Validate CSV structure
+            if processed == 0:
+                missing = [col for col in FEATURE_NAMES if col not in chunk.columns]
+                if missing:
+                    raise BatchInputError(f"Missing required columns: {', '.join(missing)}")
+
+            if max_rows is not None and processed + len(chunk) > max_rows:
+                raise BatchInputError(f"File contains too many rows. Maximum allowed: {max_rows}")
+
+            # Parse ahead while this chunk is scored
+            next_chunk = asyncio.ensure_future(asyncio.to_thread(next, reader, None))
+
+            groups = None
+            if scorer is not None:
+                features = await asyncio.to_thread(batch_feature_matrix, chunk)
+                scored, groups = await scorer.score(
+                    features, chunk.index.to_numpy(), active_models, include_contributions,
+                    encode=sink.accepts_encoded_groups
+                )
+            else:
+                scored = await inference_executor.run(score_batch_frame, chunk, active_models, include_contributions)
+            del chunk
+
+            if pending_write is not None:
+                await pending_write
+            if groups:
+                pending_write = asyncio.ensure_future(asyncio.to_thread(sink.write_encoded, scored, groups))
+            else:
+                pending_write = asyncio.ensure_future(asyncio.to_thread(sink.write, scored))
+
+            processed += len(scored.valid)
+            successful += int(scored.valid.sum())
+            if on_chunk is not None:
+                await on_chunk(processed, successful, processed - successful)
+
+        if pending_write is not None:
+            await pending_write
+    except BaseException:
+        # Let in-flight threads finish before the reader and sink go away
+        for future in (next_chunk, pending_write):
+            if future is not None and not future.done():
+                await asyncio.gather(future, return_exceptions=True)
+        reader.close()
+        await asyncio.to_thread(sink.discard)
+        raise
+
+    reader.close()
+    await asyncio.to_thread(sink.close)
+
+    if processed > successful:
+        logger.error(f"{processed - successful} of {processed} batch rows could not be scored")
+    return {"total": processed, "successful": successful, "failed": processed - successful}
+
+
+# -------------------- JSON and NDJSON records --------------------
+
+def _to_float(value) -> float:
+    if isinstance(value, (int, float, str)):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return math.nan
+
+
+def record_feature_matrix(records: List, first_row: int = 0) -> np.ndarray:
+    """(n, 7) float64 features of JSON feature records. Absent, null or
+    non-numeric values become NaN, for validation to report per row"""
+    try:
+        # Complete numeric records, the common case, are read a column at a time
+        return np.stack([
+            np.fromiter(map(itemgetter(name), records), np.float64, len(records))
+            for name in FEATURE_NAMES
+        ], axis=1)
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:
+        rows = [[record.get(name) for name in FEATURE_NAMES] for record in records]
+    except AttributeError:
+        index = next(i for i, record in enumerate(records) if not isinstance(record, dict))
+        raise BatchInputError(f"Record {first_row + index} is not a JSON object")
+    try:
+        # NumPy parses numbers, numeric strings and nulls (as NaN) in one pass
+        features = np.array(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        features = np.array([[_to_float(value) for value in row] for row in rows], dtype=np.float64)
+    return features.reshape(len(rows), len(FEATURE_NAMES))
+
+
+def _parse_json_lines(lines: List[bytes], first_row: int) -> List:
+    try:
+        # One parser call for the whole chunk instead of one per line
+        records = json.loads(b"[" + b",".join(lines) + b"]")
+        if len(records) == len(lines):
+            return records
+    except ValueError:
+        pass
+    records = []
+    for index, line in enumerate(lines):
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            raise BatchInputError(f"Record {first_row + index} is not valid JSON")
+    # Only reached when a line held several values, e.g. "{...}, {...}"
+    raise BatchInputError("Each NDJSON line must hold exactly one record")
+
+
+def _ndjson_chunk_features(lines: List[bytes], first_row: int) -> np.ndarray:
+    return record_feature_matrix(_parse_json_lines(lines, first_row), first_row)
+
+
+async def read_ndjson_features(
+        body: AsyncIterator[bytes],
+        max_rows: Optional[int] = None,
+        chunk_rows: Optional[int] = None
+) -> List[np.ndarray]:
+    """Parse an NDJSON body as it arrives into feature matrices of up to
+    `chunk_rows` rows. Only the current chunk's lines are held as text."""
+    chunk_rows = chunk_rows or settings.BATCH_CSV_CHUNK_ROWS
+    matrices: List[np.ndarray] = []
+    lines: List[bytes] = []
+    tail = b""
+    rows = 0
+
+    async def flush(count: int):
+        nonlocal lines, rows
+        if max_rows is not None and rows + count > max_rows:
+            raise BatchInputError(f"Too many records. Maximum allowed: {max_rows}")
+        matrices.append(await asyncio.to_thread(_ndjson_chunk_features, lines[:count], rows))
+        lines = lines[count:]
+        rows += count
+
+    async for data in body:
+        *complete, tail = (tail + data).split(b"\n")
+        lines.extend(line for line in complete if line.strip())
+        while len(lines) >= chunk_rows:
+            await flush(chunk_rows)
+    if tail.strip():
+        lines.append(tail)
+    if lines:
+        await flush(len(lines))
+    return matrices
+
+
+def json_records_features(
+        body: bytes,
+        max_rows: Optional[int] = None,
+        chunk_rows: Optional[int] = None
+) -> List[np.ndarray]:
+    """Feature matrices for a JSON array of records, or {"patient_data": [...]}"""
+    chunk_rows = chunk_rows or settings.BATCH_CSV_CHUNK_ROWS
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise BatchInputError(f"Invalid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("patient_data")
+    if not isinstance(data, list):
+        raise BatchInputError("Expected a JSON array of records or an object with a patient_data array")
+    if max_rows is not None and len(data) > max_rows:
+        raise BatchInputError(f"Too many records. Maximum allowed: {max_rows}")
+    return [
+        record_feature_matrix(data[start:start + chunk_rows], start)
+        for start in range(0, len(data), chunk_rows)
+    ]
@@ -11,6 +11,40 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
     CREATE_DEMO_USERS: bool = True
+    PREDICT_BATCH_WINDOW_MS: float = 2.0  # 0 disables micro-batching of /predict/single
+    PREDICT_MAX_BATCH_SIZE: int = 64
+    PREDICTION_CACHE_SIZE: int = 10000  # 0 disables the prediction cache
+    PREDICTION_CACHE_TTL_SECONDS: float = 3600
+    MODEL_OPERATOR_EMAILS: List[str] = []  # Admins allowed to activate model versions fleet-wide; empty disables /models/reload
+    MODEL_WATCH_INTERVAL_SECONDS: float = 30  # Poll models/registry/ACTIVE; 0 disables
+    MODEL_MMAP: bool = True  # Memory-map uncompressed joblib artifacts read-only
+    MODEL_CACHE_DIR: str = ""  # Where the fallback model is cached; defaults to models/.cache
+    PRELOAD_MODELS: bool = False  # Load models at import time, before the server forks workers
+    INFERENCE_THREAD_WORKERS: int = 4
+    BATCH_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    BATCH_CSV_CHUNK_ROWS: int = 5000  # Rows parsed and scored per step of a batch upload
+    BATCH_MAX_ROWS: int = 50000  # Synchronous uploads return every row in the response
+    BATCH_STREAM_CHUNK_ROWS: int = 1000  # Rows per NDJSON chunk of ?stream=true uploads; smaller reaches the client sooner
+    BATCH_RESULTS_DIR: str = ""  # Columnar batch result files; defaults to batch_results/. Share it between hosts
+    BATCH_DOWNLOAD_MAX_PAGE: int = 10000  # Largest ?limit= for paginated JSON downloads
+    BATCH_RECORDS_MAX_UPLOAD_BYTES: int = 256 * 1024 * 1024  # NDJSON bodies of /batch/predict-records
+    BATCH_RECORDS_MAX_JSON_BYTES: int = 10 * 1024 * 1024  # JSON arrays are parsed whole; larger bodies must use NDJSON
+    BATCH_RECORDS_MAX_ROWS: int = 2_000_000  # Records are held as 56-byte feature rows until scored
+    HISTORY_MAX_PAGE: int = 500  # Largest ?limit= for prediction and chat history pages
+    CHAT_SESSIONS_PAGE_SIZE: int = 100  # Default /chat/sessions page; follow X-Next-Cursor for more
+    BATCH_HISTORY_PAGE_SIZE: int = 50  # Default /batch/history page; follow X-Next-Cursor for more
+    BATCH_HISTORY_MAX_PAGE: int = 500
+    BATCH_JOB_WORKERS: int = 2  # Background batch jobs scored concurrently per process; 0 disables
+    BATCH_JOB_DIR: str = ""  # Where job uploads wait to be scored; defaults to batch_jobs/
+    BATCH_JOB_MAX_UPLOAD_BYTES: int = 512 * 1024 * 1024
+    BATCH_JOB_MAX_ROWS: int = 10_000_000  # Job memory is bounded by the chunk size, not the row count
+    BATCH_JOB_SWEEP_SECONDS: float = 30  # How often to look for queued or orphaned jobs
+    BATCH_JOB_STALE_SECONDS: float = 300  # A running job without a heartbeat this long is resumed
+    BATCH_SHARD_WORKERS: int = 0  # Processes that score background jobs in parallel shards; 0 or 1 scores in-process
+    BATCH_SHARD_ROWS: int = 25000  # Rows per shard, and per stored row group, in sharded scoring
+    BATCH_PERSIST_PREDICTIONS: bool = True  # Copy scored batch rows into predictions, so statistics count them
+    PREDICTION_BULK_INSERT_ROWS: int = 5000  # Rows per executemany; keep each statement under max_allowed_packet
+    FAST_STARTUP: bool = False  # Defer non-critical startup work (chatbot) to first use
 
     class Config:
         env_file = ".env"  # Specifies where to load the values
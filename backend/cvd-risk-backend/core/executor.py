@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _PoolStats:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.busy_seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            # Jobs waiting for a free worker
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "saturation": round(min(1.0, self.in_flight / self.workers), 3) if self.workers else 0,
+            "busy_seconds": round(self.busy_seconds, 3)
+        }
+
+
+class InferenceExecutor:
+    """Runs CPU-bound inference off the event loop on a thread pool.
+
+    NumPy releases the GIL for the heavy lifting, so scoring in threads keeps the
+    loop responsive without pickling features or models. All request-time scoring,
+    including synchronous batch uploads, runs here. Only background jobs can be
+    sharded across processes (core.sharded_scoring), and only when
+    BATCH_SHARD_WORKERS is above 1; it is off by default.
+    """
+
+    def __init__(self, thread_workers: int):
+        self._thread_pool = ThreadPoolExecutor(max_workers=max(1, thread_workers), thread_name_prefix="inference")
+        self._stats = _PoolStats(max(1, thread_workers))
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run `fn(*args)` on the thread pool"""
+        stats = self._stats
+        stats.submitted += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._thread_pool, fn, *args)
+            stats.completed += 1
+            return result
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.busy_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict:
+        return {"thread_pool": self._stats.as_dict()}
+
+    def shutdown(self):
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+
+
+inference_executor = InferenceExecutor(thread_workers=settings.INFERENCE_THREAD_WORKERS)
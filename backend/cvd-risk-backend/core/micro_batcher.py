@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.executor import InferenceExecutor, inference_executor
+from core.model_utils import score_versioned
+
+logger = logging.getLogger(__name__)
+
+# Number of recent queue waits kept for percentile reporting
+QUEUE_WAIT_SAMPLES = 1024
+
+
+class MicroBatcher:
+    """Coalesce concurrent single predictions into one matrix scoring call.
+
+    Requests arriving within `window_ms` of the first queued request (or until
+    `max_batch_size` is reached) are scored together and each caller's future is
+    resolved with its own probability, logit contributions and the model version
+    that scored it.
+    """
+
+    def __init__(
+            self,
+            score_fn: Callable[[np.ndarray], Tuple[np.ndarray, Optional[np.ndarray], str]],
+            window_ms: float,
+            max_batch_size: int,
+            executor: Optional[InferenceExecutor] = None
+    ):
+        self.score_fn = score_fn
+        self.executor = executor
+        self._scoring_tasks: Set[asyncio.Task] = set()
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[Tuple[List[float], asyncio.Future, float]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.queue_waits = deque(maxlen=QUEUE_WAIT_SAMPLES)
+
+    async def submit(self, features: List[float]) -> Tuple[float, Optional[List[float]], str]:
+        """Queue one feature vector and wait for its probability, contributions and model version"""
+        if self.window <= 0:
+            probabilities, contributions, version = await self._run_score(np.array([features], dtype=np.float64))
+            return (
+                float(probabilities[0]),
+                contributions[0].tolist() if contributions is not None else None,
+                version
+            )
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        self.requests += len(batch)
+        self.batches += 1
+        self.batch_sizes[len(batch)] += 1
+        for _, _, queued_at in batch:
+            wait = now - queued_at
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            self.queue_waits.append(wait)
+
+        task = asyncio.get_running_loop().create_task(self._score_batch(batch))
+        # Held until done so the task can't be garbage-collected mid-flight
+        self._scoring_tasks.add(task)
+        task.add_done_callback(self._scoring_tasks.discard)
+
+    async def _run_score(self, features: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray], str]:
+        if self.executor is None:
+            return self.score_fn(features)
+        return await self.executor.run(self.score_fn, features)
+
+    async def _score_batch(self, batch: List[Tuple[List[float], asyncio.Future, float]]):
+        try:
+            probabilities, contributions, version = await self._run_score(
+                np.array([f for f, _, _ in batch], dtype=np.float64)
+            )
+        except Exception as e:
+            logger.error(f"Micro-batch of {len(batch)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        contribution_rows = contributions.tolist() if contributions is not None else [None] * len(batch)
+        for (_, future, _), probability, row in zip(batch, probabilities.tolist(), contribution_rows):
+            # Callers that disconnected leave a cancelled future behind
+            if not future.done():
+                future.set_result((probability, row, version))
+
+    def stats(self) -> Dict:
+        """Batch-size distribution and queueing time since startup"""
+        waits_ms = np.array(self.queue_waits) * 1000
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0,
+            "batch_size_distribution": dict(sorted(self.batch_sizes.items())),
+            "queue_wait_ms": {
+                "mean": round(self.queue_wait_total * 1000 / self.requests, 3) if self.requests else 0,
+                "p50": round(float(np.percentile(waits_ms, 50)), 3) if len(waits_ms) else 0,
+                "p99": round(float(np.percentile(waits_ms, 99)), 3) if len(waits_ms) else 0,
+                "max": round(self.queue_wait_max * 1000, 3),
+            },
+        }
+
+
+micro_batcher = MicroBatcher(
+    score_versioned,
+    window_ms=settings.PREDICT_BATCH_WINDOW_MS,
+    max_batch_size=settings.PREDICT_MAX_BATCH_SIZE,
+    executor=inference_executor
+)
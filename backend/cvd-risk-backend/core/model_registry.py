@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+# Versioned artifacts live in models/registry/<version>/ next to a manifest.json
+# holding their checksums. The ACTIVE file names the version workers should serve.
+REGISTRY_DIR = Path(os.path.dirname(os.path.abspath(__file__))).parent / "models" / "registry"
+MANIFEST_NAME = "manifest.json"
+ACTIVE_POINTER = "ACTIVE"
+ARTIFACTS = ("classifier", "scaler")
+
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+class ModelRegistryError(Exception):
+    """Raised for unknown versions, missing artifacts or checksum mismatches"""
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _version_dir(version: str) -> Path:
+    if not VERSION_PATTERN.match(version):
+        raise ModelRegistryError(f"Invalid model version: {version!r}")
+    return REGISTRY_DIR / version
+
+
+def read_manifest(version: str) -> Dict:
+    manifest_path = _version_dir(version) / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise ModelRegistryError(f"Model version {version} not found")
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def list_versions() -> List[Dict]:
+    """Manifests of every registered version, oldest first"""
+    if not REGISTRY_DIR.exists():
+        return []
+    manifests = []
+    for manifest_path in REGISTRY_DIR.glob(f"*/{MANIFEST_NAME}"):
+        try:
+            with open(manifest_path) as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable manifest {manifest_path}: {e}")
+    return sorted(manifests, key=lambda m: (m.get("created_at", ""), m.get("version", "")))
+
+
+def get_active_version() -> Optional[str]:
+    """Version named by the ACTIVE pointer, else the newest registered version"""
+    pointer = REGISTRY_DIR / ACTIVE_POINTER
+    if pointer.exists():
+        version = pointer.read_text().strip()
+        if version:
+            return version
+    versions = list_versions()
+    return versions[-1]["version"] if versions else None
+
+
+def set_active_version(version: str):
+    """Atomically repoint ACTIVE so every worker's watcher picks the version up"""
+    read_manifest(version)
+    tmp_path = REGISTRY_DIR / f".{ACTIVE_POINTER}.tmp"
+    tmp_path.write_text(version)
+    os.replace(tmp_path, REGISTRY_DIR / ACTIVE_POINTER)
+
+
+def active_pointer_mtime() -> Optional[float]:
+    try:
+        return (REGISTRY_DIR / ACTIVE_POINTER).stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def load_version_artifacts(version: str, mmap_mode: Optional[str] = None) -> Dict[str, Any]:
+    """Verify checksums and deserialize every artifact of a version.
+
+    With mmap_mode="r" the numpy arrays inside the estimators are mapped from
+    the page cache, so every worker on the host shares one read-only copy.
+    """
+    manifest = read_manifest(version)
+    version_dir = _version_dir(version)
+    loaded: Dict[str, Any] = {"manifest": manifest}
+
+    for name in ARTIFACTS:
+        entry = manifest.get("artifacts", {}).get(name)
+        if not entry:
+            raise ModelRegistryError(f"Model version {version} has no {name} artifact")
+        path = version_dir / entry["path"]
+        if not path.exists():
+            raise ModelRegistryError(f"Missing artifact {path}")
+        checksum = file_sha256(path)
+        if checksum != entry["sha256"]:
+            raise ModelRegistryError(
+                f"Checksum mismatch for {path}: expected {entry['sha256']}, got {checksum}"
+            )
+        loaded[name] = joblib.load(path, mmap_mode=mmap_mode)
+
+    return loaded
+
+
+def register_version(version: str, classifier_path: Path, scaler_path: Path) -> Dict:
+    """Copy trained artifacts into the registry and write their manifest"""
+    version_dir = _version_dir(version)
+    if version_dir.exists():
+        raise ModelRegistryError(f"Model version {version} already exists")
+    version_dir.mkdir(parents=True)
+
+    artifacts = {}
+    for name, source in zip(ARTIFACTS, (classifier_path, scaler_path)):
+        target = version_dir / f"{name}.joblib"
+        # Re-dumped uncompressed: joblib can only memory-map uncompressed arrays
+        joblib.dump(joblib.load(source), target)
+        artifacts[name] = {"path": target.name, "sha256": file_sha256(target)}
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "artifacts": artifacts
+    }
+    with open(version_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Registered model version {version}")
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Register trained model artifacts as a new version")
+    parser.add_argument("version")
+    parser.add_argument("classifier", type=Path)
+    parser.add_argument("scaler", type=Path)
+    parser.add_argument("--activate", action="store_true", help="Point ACTIVE at the new version")
+    args = parser.parse_args()
+
+    print(json.dumps(register_version(args.version, args.classifier, args.scaler), indent=2))
+    if args.activate:
+        set_active_version(args.version)
+        print(f"Active version set to {args.version}")
@@ -1,14 +1,27 @@
+import hashlib
 import joblib
+import json
 import numpy as np
-import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from datetime import datetime, timezone
+from importlib.metadata import version as package_version
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
 import logging
 import os
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.datasets import make_classification
+import threading
+import time
 import warnings
+from core.config import settings
+from core import model_registry
+from core.validation import FEATURE_NAMES, FEATURE_RULES, row_error_messages, validate_features
+
+# pandas and the sklearn training utilities are imported where they are used, so
+# importing this module (and starting the API) only pays for NumPy
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
 
 # Suppress sklearn warnings
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -24,90 +37,332 @@ RISK_COLORS = {
     RISK_MODERATE: "orange",
     RISK_HIGH: "red"
 }
+RISK_CATEGORIES = [RISK_LOW, RISK_MODERATE, RISK_HIGH]
+RISK_THRESHOLDS = [30, 70]  # Upper bounds (exclusive) of Low and Moderate, in percent
+
+# Schema fields declared as int, reported back as ints in features_used
+INTEGER_FEATURES = [j for j, rule in enumerate(FEATURE_RULES) if rule.dtype is int]
+
+MODELS_DIR = Path(os.path.dirname(os.path.abspath(__file__))).parent / "models"
+
+# Number of risk-raising features reported as key factors
+KEY_FACTOR_COUNT = 3
+
+# Inputs of the fallback model; part of its cache fingerprint
+DUMMY_TRAINING_PARAMS = {
+    "n_samples": 1000,
+    "n_features": 7,
+    "n_informative": 5,
+    "n_classes": 2,
+    "random_state": 42,
+    "max_iter": 1000
+}
 
-# Global model storage
+# Active model snapshot. Reloads build a new dict and rebind this name, so code
+# holding a reference keeps scoring on the version it started with.
 models = {}
 
 
-def load_models():
-    """Load ML models and scaler at application startup"""
+class PredictionCache:
+    """Bounded LRU cache of prediction payloads with a time-to-live.
+
+    Keys are the feature tuple plus the loaded model version and the caller's
+    role (advice differs between patients and doctors).
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(features: List[float], user_data: Optional[dict], version: Optional[str]) -> tuple:
+        role = user_data.get("role", "patient") if user_data else "patient"
+        return tuple(features), version, role
+
+    def get(self, features: List[float], user_data: Optional[dict] = None) -> Optional[Dict]:
+        if self.max_size <= 0:
+            return None
+        key = self._key(features, user_data, models.get("version"))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers add ids and timestamps to the payload, so hand out a copy
+        return dict(result)
+
+    def put(self, features: List[float], user_data: Optional[dict], result: Dict):
+        if self.max_size <= 0:
+            return
+        # Keyed on the version that produced the result, which may already be stale
+        key = self._key(features, user_data, result.get("model_version"))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0
+        }
+
+
+prediction_cache = PredictionCache(settings.PREDICTION_CACHE_SIZE, settings.PREDICTION_CACHE_TTL_SECONDS)
+
+
+def get_models() -> Dict:
+    """Current model snapshot"""
+    return models
+
+
+def model_fingerprint(classifier, scaler) -> str:
+    """Digest of the fitted models. Unlike the version name ("production") it
+    changes whenever the artifacts do, so it can key stored results"""
+    import pickle
+
+    return hashlib.sha256(pickle.dumps((classifier, scaler), protocol=4)).hexdigest()
+
+
+def build_models(classifier, scaler, version: str, manifest: Optional[Dict] = None) -> Dict:
+    """Assemble a model snapshot ready to be activated"""
+    return {
+        "classifier": classifier,
+        "scaler": scaler,
+        "kernel": compile_kernel(scaler, classifier),
+        "version": version,
+        "fingerprint": model_fingerprint(classifier, scaler),
+        "manifest": manifest,
+        "loaded_at": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def activate_models(new_models: Dict):
+    """Swap in a new snapshot; in-flight predictions finish on the old one"""
     global models
-    current_dir = Path(os.path.dirname(os.path.abspath(__file__)))
-    models_dir = current_dir.parent / "models"
+    previous = models.get("version")
+    models = new_models
+    prediction_cache.clear()
+    logger.info(f"Active model version: {new_models['version']} (previous: {previous})")
+
+
+def _mmap_mode() -> Optional[str]:
+    return "r" if settings.MODEL_MMAP else None
 
+
+def load_model_version(version: str) -> Dict:
+    """Load and verify a registered version without activating it"""
+    artifacts = model_registry.load_version_artifacts(version, mmap_mode=_mmap_mode())
+    return build_models(artifacts["classifier"], artifacts["scaler"], version, artifacts["manifest"])
+
+
+def load_models() -> str:
+    """Load ML models and scaler at application startup; returns where they came from"""
     try:
-        classifier_path = models_dir / "final_logreg_model_7features.joblib"
-        scaler_path = models_dir / "scaler_7features.joblib"
+        active_version = model_registry.get_active_version()
+        if active_version:
+            activate_models(load_model_version(active_version))
+            logger.info(f"Model version {active_version} loaded from registry")
+            return "registry"
+
+        classifier_path = MODELS_DIR / "final_logreg_model_7features.joblib"
+        scaler_path = MODELS_DIR / "scaler_7features.joblib"
 
         if classifier_path.exists() and scaler_path.exists():
-            models["classifier"] = joblib.load(classifier_path)
-            models["scaler"] = joblib.load(scaler_path)
+            activate_models(build_models(
+                joblib.load(classifier_path, mmap_mode=_mmap_mode()),
+                joblib.load(scaler_path, mmap_mode=_mmap_mode()),
+                "production"
+            ))
             logger.info("Production models loaded successfully")
-            return
+            return "production"
 
         logger.warning("Production models not found. Creating dummy models")
-        self_train_dummy_models()
+        return self_train_dummy_models()
     except Exception as e:
         logger.error(f"Error loading models: {e}")
-        self_train_dummy_models()
+        return self_train_dummy_models()
+
+
+def dummy_model_fingerprint() -> str:
+    """Stable id of the fallback model: same training inputs and library versions, same model"""
+    payload = json.dumps({
+        "params": DUMMY_TRAINING_PARAMS,
+        "sklearn": package_version("scikit-learn"),
+        "numpy": np.__version__
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _dummy_cache_dir() -> Path:
+    cache_root = Path(settings.MODEL_CACHE_DIR) if settings.MODEL_CACHE_DIR else MODELS_DIR / ".cache"
+    return cache_root / f"dummy-{dummy_model_fingerprint()}"
+
+
+def self_train_dummy_models() -> str:
+    """Create and train dummy models when real models are unavailable.
+
+    The fitted artifacts are cached on disk under their fingerprint, so later
+    boots (and other workers) load them instead of retraining.
+    """
+    from sklearn.datasets import make_classification
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
 
+    cache_dir = _dummy_cache_dir()
+    classifier_path = cache_dir / "classifier.joblib"
+    scaler_path = cache_dir / "scaler.joblib"
+
+    if classifier_path.exists() and scaler_path.exists():
+        try:
+            activate_models(build_models(
+                joblib.load(classifier_path, mmap_mode=_mmap_mode()),
+                joblib.load(scaler_path, mmap_mode=_mmap_mode()),
+                "dummy"
+            ))
+            logger.info(f"Dummy models loaded from cache {cache_dir}")
+            return "dummy-cache"
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable dummy model cache {cache_dir}: {e}")
 
-def self_train_dummy_models():
-    """Create and train dummy models when real models are unavailable"""
     X, y = make_classification(
-        n_samples=1000,
-        n_features=7,
-        n_informative=5,
-        n_classes=2,
-        random_state=42
+        n_samples=DUMMY_TRAINING_PARAMS["n_samples"],
+        n_features=DUMMY_TRAINING_PARAMS["n_features"],
+        n_informative=DUMMY_TRAINING_PARAMS["n_informative"],
+        n_classes=DUMMY_TRAINING_PARAMS["n_classes"],
+        random_state=DUMMY_TRAINING_PARAMS["random_state"]
     )
 
-    models["scaler"] = StandardScaler()
-    X_scaled = models["scaler"].fit_transform(X)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
 
-    models["classifier"] = LogisticRegression(max_iter=1000, random_state=42)
-    models["classifier"].fit(X_scaled, y)
+    classifier = LogisticRegression(
+        max_iter=DUMMY_TRAINING_PARAMS["max_iter"],
+        random_state=DUMMY_TRAINING_PARAMS["random_state"]
+    )
+    classifier.fit(X_scaled, y)
+    activate_models(build_models(classifier, scaler, "dummy"))
     logger.info("Dummy models created successfully")
 
-
-def predict_cvd_risk(features: List[float], user_data: Optional[dict] = None) -> Dict:
-    """Predict CVD risk from input features"""
     try:
-        if len(features) != 7:
-            raise ValueError("Exactly 7 features required")
-
-        features_array = np.array(features).reshape(1, -1)
-        features_scaled = models["scaler"].transform(features_array)
-
-        probability = models["classifier"].predict_proba(features_scaled)[0][1]
-        risk_percent = round(probability * 100, 2)  # Renamed to lowercase
-
-        if risk_percent < 30:
-            risk_category = RISK_LOW
-        elif risk_percent < 70:
-            risk_category = RISK_MODERATE
-        else:
-            risk_category = RISK_HIGH
-
-        personalized_advice = generate_personalized_advice(
-            risk_percent,  # Use renamed variable
-            risk_category,
-            user_data
-        )
-
-        feature_names = ["sex", "age", "cigsPerDay", "totChol", "sysBP", "diaBP", "glucose"]
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for artifact, path in ((classifier, classifier_path), (scaler, scaler_path)):
+            # Written under a temporary name so concurrent workers never read a partial file
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            joblib.dump(artifact, tmp_path)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache dummy models in {cache_dir}: {e}")
+
+    return "dummy-trained"
+
+
+class FusedLogisticKernel:
+    """Logistic regression with the StandardScaler folded into its coefficients.
+
+    sigmoid(((x - mean) / scale) . w + b) == sigmoid(x . (w / scale) + (b - mean . w / scale)),
+    so scoring is a single dot product plus a sigmoid with no sklearn validation overhead.
+    """
+
+    def __init__(self, scaler: "StandardScaler", classifier: "LogisticRegression"):
+        n_features = len(FEATURE_NAMES)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+        self.coef = np.asarray(classifier.coef_[0], dtype=np.float64) / scale
+        # Per-feature share of the folded intercept, so x * coef - offsets gives each
+        # feature's contribution to the logit: ((x - mean) / scale) * w
+        self.offsets = self.coef * mean
+        self.intercept = float(classifier.intercept_[0] - self.offsets.sum())
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Positive-class probabilities for an (n, 7) feature matrix"""
+        z = features @ self.coef + self.intercept
+        with np.errstate(over="ignore"):
+            return 1.0 / (1.0 + np.exp(-z))
+
+    def contributions(self, features: np.ndarray) -> np.ndarray:
+        """(n, 7) matrix of per-feature logit contributions"""
+        return features * self.coef - self.offsets
+
+
+def compile_kernel(scaler, classifier) -> Optional[FusedLogisticKernel]:
+    """Build the fused scorer, or return None if the models can't be folded"""
+    # Already imported by unpickling or training the models, so this is free
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    if not (
+            isinstance(scaler, StandardScaler)
+            and isinstance(classifier, LogisticRegression)
+            and classifier.coef_.shape == (1, len(FEATURE_NAMES))
+    ):
+        logger.warning("Models don't support the fused kernel. Falling back to sklearn inference")
+        return None
+    return FusedLogisticKernel(scaler, classifier)
+
+
+def build_prediction_result(
+        features: List[float],
+        probability: float,
+        user_data: Optional[dict] = None,
+        model_version: Optional[str] = None,
+        contributions: Optional[List[float]] = None
+) -> Dict:
+    """Turn an already scored probability (and optional logit contributions) into the prediction payload"""
+    risk_percent = float(risk_percentages(np.float64(probability)))
+    risk_category = RISK_CATEGORIES[int(categorize_risk(risk_percent))]
+
+    personalized_advice = generate_personalized_advice(
+        risk_percent,  # Use renamed variable
+        risk_category,
+        user_data
+    )
 
-        return {
-            "probability": float(probability),
-            "risk_percentage": risk_percent,  # Use renamed variable
-            "risk_category": risk_category,
-            "risk_color": RISK_COLORS[risk_category],
-            "personalized_advice": personalized_advice,
-            "features_used": dict(zip(feature_names, features))
-        }
-    except Exception as e:
-        logger.error(f"Prediction failed: {e}")
-        raise RuntimeError(f"Prediction error: {e}")
+    result = {
+        "probability": float(probability),
+        "risk_percentage": risk_percent,  # Use renamed variable
+        "risk_category": risk_category,
+        "risk_color": RISK_COLORS[risk_category],
+        "personalized_advice": personalized_advice,
+        "features_used": dict(zip(FEATURE_NAMES, features)),
+        "model_version": model_version
+    }
+    if contributions is not None:
+        result["feature_contributions"] = dict(zip(FEATURE_NAMES, contributions))
+        result["key_factors"] = [
+            FEATURE_NAMES[i]
+            for i in sorted(range(len(contributions)), key=lambda i: -contributions[i])[:KEY_FACTOR_COUNT]
+            if contributions[i] > 0
+        ]
+    return result
 
 
 def generate_personalized_advice(
@@ -142,34 +397,329 @@ def generate_personalized_advice(
     return f"{base_advice} ACTION ITEMS: {patient_actions.get(risk_category, '')}"
 
 
-def batch_predict_cvd_risk(df: pd.DataFrame) -> List[Dict]:
-    """Batch prediction for CSV data"""
-    results = []
-    required_columns = ["sex", "age", "cigsPerDay", "totChol", "sysBP", "diaBP", "glucose"]
+def predict_proba_matrix(features: np.ndarray, active: Optional[Dict] = None) -> np.ndarray:
+    """Score an (n, 7) feature matrix with a single scaler/classifier pass"""
+    active = active or models
+    kernel = active.get("kernel")
+    if kernel is not None:
+        return kernel.predict_proba(features)
+    features_scaled = active["scaler"].transform(features)
+    return active["classifier"].predict_proba(features_scaled)[:, 1]
+
+
+def feature_contributions(features: np.ndarray, active: Optional[Dict] = None) -> Optional[np.ndarray]:
+    """(n, 7) per-feature contributions to the logit: scaled value times coefficient.
+
+    Returns None for classifiers without linear coefficients.
+    """
+    active = active or models
+    kernel = active.get("kernel")
+    if kernel is not None:
+        return kernel.contributions(features)
+    coef = getattr(active["classifier"], "coef_", None)
+    if coef is None or coef.shape != (1, len(FEATURE_NAMES)):
+        return None
+    return active["scaler"].transform(features) * coef[0]
+
+
+def key_factor_indexes(contributions: np.ndarray) -> np.ndarray:
+    """Indexes of the KEY_FACTOR_COUNT largest contributions per row, -1 where not risk-raising"""
+    top = np.argsort(-contributions, axis=1, kind="stable")[:, :KEY_FACTOR_COUNT]
+    return np.where(np.take_along_axis(contributions, top, axis=1) > 0, top, -1)
+
+
+def score_versioned(features: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray], str]:
+    """Score a feature matrix; returns probabilities, logit contributions and the model version"""
+    active = models
+    return predict_proba_matrix(features, active), feature_contributions(features, active), active["version"]
+
+
+def risk_percentages(probabilities: np.ndarray) -> np.ndarray:
+    """Probabilities as percentages to two decimals, the same way on every scoring path"""
+    return np.round(probabilities * 100, 2)
+
+
+def categorize_risk(risk_percent: np.ndarray) -> np.ndarray:
+    """Map risk percentages to indexes into RISK_CATEGORIES"""
+    return np.searchsorted(RISK_THRESHOLDS, risk_percent, side="right")
+
+
+class ScoredBatch(NamedTuple):
+    """Array-form scores for one chunk of batch rows.
+
+    Compact and cheap to pickle, so chunks scored in a process worker come
+    back without building per-row dicts; `scored_batch_records` expands them.
+    """
+    row_ids: np.ndarray
+    features: np.ndarray
+    cell_errors: np.ndarray  # (n, 7) core.validation CELL_* codes
+    valid: np.ndarray
+    probabilities: np.ndarray
+    risk_percent: np.ndarray
+    category_idx: np.ndarray
+    contributions: Optional[np.ndarray]
+    model_version: str
+
+
+def batch_feature_matrix(df: "pd.DataFrame") -> np.ndarray:
+    """(n, 7) float64 features of a DataFrame chunk; non-numeric cells become NaN.
+
+    Integer fields are read as float64 too, so a value like 2.5 survives to be
+    reported by validation instead of being truncated.
+    """
+    import pandas as pd
 
     # Validate columns
-    missing_cols = [col for col in required_columns if col not in df.columns]
+    missing_cols = [col for col in FEATURE_NAMES if col not in df.columns]
     if missing_cols:
         raise ValueError(f"Missing required columns: {missing_cols}")
 
-    # Process each row
-    for idx, row in df.iterrows():
-        try:
-            features = [row[col] for col in required_columns]
-            result = predict_cvd_risk(features)
-            result["row_id"] = idx
-            results.append(result)
-        except Exception as e:
-            logger.error(f"Row {idx} prediction failed: {e}")
+    features = np.empty((len(df), len(FEATURE_NAMES)), dtype=np.float64)
+    for j, name in enumerate(FEATURE_NAMES):
+        column = df[name]
+        if column.dtype.kind not in "iuf":
+            column = pd.to_numeric(column, errors="coerce")
+        features[:, j] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    return features
+
+
+def score_feature_matrix(
+        features: np.ndarray,
+        row_ids: np.ndarray,
+        active: Optional[Dict] = None,
+        include_contributions: bool = False
+) -> ScoredBatch:
+    """Vectorized scoring of a feature matrix. Rows that break the PredictionInput
+    rules are flagged in `valid` and `cell_errors` and left unscored"""
+    cell_errors = validate_features(features)
+    valid = ~cell_errors.any(axis=1)
+
+    active = active or models
+    probabilities = np.zeros(len(features))
+    if valid.any():
+        probabilities[valid] = predict_proba_matrix(features[valid], active)
+    risk_percent = risk_percentages(probabilities)
+
+    contributions = None
+    if include_contributions:
+        contributions = np.zeros_like(features)
+        valid_contributions = feature_contributions(features[valid], active) if valid.any() else None
+        if valid_contributions is not None:
+            contributions[valid] = valid_contributions
+
+    return ScoredBatch(
+        row_ids=row_ids,
+        features=features,
+        cell_errors=cell_errors,
+        valid=valid,
+        probabilities=probabilities,
+        risk_percent=risk_percent,
+        category_idx=categorize_risk(risk_percent),
+        contributions=contributions,
+        model_version=active["version"]
+    )
+
+
+def score_batch_frame(
+        df: "pd.DataFrame",
+        active: Optional[Dict] = None,
+        include_contributions: bool = False
+) -> ScoredBatch:
+    """Vectorized scoring of a DataFrame chunk, keyed by its index"""
+    return score_feature_matrix(batch_feature_matrix(df), df.index.to_numpy(), active, include_contributions)
+
+
+def category_advice() -> List[str]:
+    """Batch advice text per risk category, indexed like RISK_CATEGORIES"""
+    return [generate_personalized_advice(0.0, category) for category in RISK_CATEGORIES]
+
+
+def _feature_rows(features: np.ndarray) -> List[list]:
+    """Feature matrix as row lists with the integer schema fields as ints, which
+    valid rows were checked to hold. Invalid rows report no features"""
+    rows = features.tolist()
+    for row in rows:
+        for j in INTEGER_FEATURES:
+            if row[j] == row[j]:  # int() rejects NaN
+                row[j] = int(row[j])
+    return rows
+
+
+def scored_batch_records(scored: ScoredBatch, advice: Optional[List[str]] = None) -> List[Dict]:
+    """Expand a ScoredBatch into the per-row result dicts the API returns.
+
+    `advice` overrides the per-category advice text, e.g. with the text stored
+    alongside results that were scored earlier.
+    """
+    contribution_rows = key_factor_rows = None
+    if scored.contributions is not None:
+        contribution_rows = scored.contributions.tolist()
+        key_factor_rows = key_factor_indexes(scored.contributions).tolist()
+
+    # Advice only depends on category and role, so render it once per category
+    advice = advice or category_advice()
+
+    invalid_rows = np.flatnonzero(~scored.valid)
+    errors = dict(zip(invalid_rows.tolist(), row_error_messages(scored.cell_errors, invalid_rows)))
+
+    results = []
+    rows = _feature_rows(scored.features)
+    for i, (row_id, is_valid, probability, percent, category) in enumerate(zip(
+            scored.row_ids.tolist(), scored.valid.tolist(), scored.probabilities.tolist(),
+            scored.risk_percent.tolist(), scored.category_idx.tolist()
+    )):
+        if not is_valid:
             results.append({
-                "row_id": idx,
-                "error": str(e),
+                "row_id": row_id,
+                "error": errors[i],
                 "risk_category": "Error"
             })
+            continue
+
+        risk_category = RISK_CATEGORIES[category]
+        result = {
+            "probability": probability,
+            "risk_percentage": percent,
+            "risk_category": risk_category,
+            "risk_color": RISK_COLORS[risk_category],
+            "personalized_advice": advice[category],
+            "features_used": dict(zip(FEATURE_NAMES, rows[i])),
+            "model_version": scored.model_version
+        }
+        if contribution_rows is not None:
+            result["feature_contributions"] = dict(zip(FEATURE_NAMES, contribution_rows[i]))
+            result["key_factors"] = [FEATURE_NAMES[j] for j in key_factor_rows[i] if j >= 0]
+        result["row_id"] = row_id
+        results.append(result)
 
     return results
 
 
+def scored_batch_ndjson(scored: ScoredBatch, advice: Optional[List[str]] = None) -> str:
+    """NDJSON for a ScoredBatch, byte-identical to json.dumps of each record.
+
+    The per-category text is encoded once and rows are filled into a %-template,
+    which is several times faster than building and dumping a dict per row.
+    """
+    # Advice only depends on category and role, so render it once per category
+    category_text = [
+        (f', "risk_category": {json.dumps(category)}, "risk_color": {json.dumps(RISK_COLORS[category])}, '
+         f'"personalized_advice": {json.dumps(text)}, ')
+        for category, text in zip(RISK_CATEGORIES, advice or category_advice())
+    ]
+    features_template = "{" + ", ".join(
+        f'"{name}": %d' if j in INTEGER_FEATURES else f'"{name}": %r' for j, name in enumerate(FEATURE_NAMES)
+    ) + "}"
+    contributions_template = "{" + ", ".join(f'"{name}": %r' for name in FEATURE_NAMES) + "}"
+    version_text = f', "model_version": {json.dumps(scored.model_version)}'
+
+    contribution_rows = key_factor_rows = None
+    key_factor_text: Dict[Tuple[int, ...], str] = {}
+    if scored.contributions is not None:
+        contribution_rows = scored.contributions.tolist()
+        key_factor_rows = key_factor_indexes(scored.contributions).tolist()
+
+    invalid_rows = np.flatnonzero(~scored.valid)
+    errors = dict(zip(invalid_rows.tolist(), row_error_messages(scored.cell_errors, invalid_rows)))
+
+    lines = []
+    rows = scored.features.tolist()
+    for i, (row_id, is_valid, probability, percent, category) in enumerate(zip(
+            scored.row_ids.tolist(), scored.valid.tolist(), scored.probabilities.tolist(),
+            scored.risk_percent.tolist(), scored.category_idx.tolist()
+    )):
+        if not is_valid:
+            lines.append(json.dumps({
+                "row_id": row_id,
+                "error": errors[i],
+                "risk_category": "Error"
+            }))
+            continue
+
+        line = (f'{{"probability": {probability!r}, "risk_percentage": {percent!r}{category_text[category]}'
+                f'"features_used": {features_template % tuple(rows[i])}{version_text}')
+        if contribution_rows is not None:
+            factor_idx = tuple(key_factor_rows[i])
+            key_factors = key_factor_text.get(factor_idx)
+            if key_factors is None:
+                key_factors = json.dumps([FEATURE_NAMES[j] for j in factor_idx if j >= 0])
+                key_factor_text[factor_idx] = key_factors
+            line += (f', "feature_contributions": {contributions_template % tuple(contribution_rows[i])}'
+                     f', "key_factors": {key_factors}')
+        lines.append(f'{line}, "row_id": {row_id}}}')
+
+    return "\n".join(lines)
+
+
+def scored_prediction_data(scored: ScoredBatch) -> List[Dict]:
+    """Successfully scored rows in the shape crud.create_prediction takes"""
+    valid = np.flatnonzero(scored.valid)
+    features = scored.features[valid]
+    # sex, age and cigsPerDay were validated as whole numbers
+    whole = features[:, :3].astype(np.int64).tolist()
+    measured = features[:, 3:].tolist()
+    return [
+        {
+            "sex": sex, "age": age, "cigsPerDay": cigs,
+            "totChol": chol, "sysBP": sys_bp, "diaBP": dia_bp, "glucose": glucose,
+            "probability": probability,
+            "risk_percentage": percent,
+            "risk_category": RISK_CATEGORIES[category]
+        }
+        for (sex, age, cigs), (chol, sys_bp, dia_bp, glucose), probability, percent, category in zip(
+            whole, measured, scored.probabilities[valid].tolist(),
+            scored.risk_percent[valid].tolist(), scored.category_idx[valid].tolist()
+        )
+    ]
+
+
+def batch_csv_columns(include_contributions: bool = False) -> List[str]:
+    columns = ["row_id"] + FEATURE_NAMES + [
+        "probability", "risk_percentage", "risk_category", "risk_color", "model_version"
+    ]
+    if include_contributions:
+        columns += [f"contribution_{name}" for name in FEATURE_NAMES] + ["key_factors"]
+    return columns + ["personalized_advice", "error"]
+
+
+def scored_batch_csv(scored: ScoredBatch, advice: Optional[List[str]] = None, header: bool = False) -> str:
+    """CSV rows for a ScoredBatch, one column per field (see batch_csv_columns).
+
+    Key factors are joined with ';'. Error rows keep their features and the
+    error message, with the score columns left empty.
+    """
+    import pandas as pd
+
+    advice = np.array(advice or category_advice(), dtype=object)
+    categories = np.array(RISK_CATEGORIES, dtype=object)
+    colors = np.array([RISK_COLORS[category] for category in RISK_CATEGORIES], dtype=object)
+    invalid = ~scored.valid
+
+    frame = pd.DataFrame({"row_id": scored.row_ids})
+    for j, name in enumerate(FEATURE_NAMES):
+        frame[name] = scored.features[:, j]
+    frame["probability"] = np.where(invalid, np.nan, scored.probabilities)
+    frame["risk_percentage"] = np.where(invalid, np.nan, scored.risk_percent)
+    frame["risk_category"] = np.where(invalid, "Error", categories[scored.category_idx])
+    frame["risk_color"] = np.where(invalid, None, colors[scored.category_idx])
+    frame["model_version"] = np.where(invalid, None, scored.model_version)
+    if scored.contributions is not None:
+        for j, name in enumerate(FEATURE_NAMES):
+            frame[f"contribution_{name}"] = np.where(invalid, np.nan, scored.contributions[:, j])
+        factor_names = np.array(FEATURE_NAMES + [""], dtype=object)
+        factors = factor_names[key_factor_indexes(scored.contributions)]
+        frame["key_factors"] = [";".join(name for name in row if name) for row in factors.tolist()]
+        frame.loc[invalid, "key_factors"] = None
+    frame["personalized_advice"] = np.where(invalid, None, advice[scored.category_idx])
+
+    errors = np.full(len(frame), None, dtype=object)
+    invalid_rows = np.flatnonzero(invalid)
+    errors[invalid_rows] = row_error_messages(scored.cell_errors, invalid_rows)
+    frame["error"] = errors
+
+    return frame.to_csv(index=False, header=header, lineterminator="\n")
+
+
 def get_model_info() -> Dict:
     """Get information about loaded models"""
     if not models:
@@ -181,6 +731,11 @@ def get_model_info() -> Dict:
     return {
         "classifier_type": type(classifier).__name__ if classifier else None,
         "scaler_type": type(scaler).__name__ if scaler else None,
+        "fused_kernel": models.get("kernel") is not None,
+        "version": models.get("version"),
+        "manifest": models.get("manifest"),
+        "loaded_at": models.get("loaded_at"),
+        "available_versions": [m.get("version") for m in model_registry.list_versions()],
         "features": 7,
         "status": "loaded"
     }
\ No newline at end of file
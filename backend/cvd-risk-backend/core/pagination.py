@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    """Raised for cursors that were tampered with or belong to another listing"""
+
+
+def encode_cursor(position: Dict) -> str:
+    """Opaque, URL-safe cursor for a page position"""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError("Invalid pagination cursor")
+    if not isinstance(position, dict):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return position
+
+
+def encode_keyset_cursor(created_at: datetime, row_id: int) -> str:
+    """Cursor for the last row of a newest-first page ordered by (created_at, id)"""
+    return encode_cursor({"created_at": created_at.isoformat(), "id": row_id})
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[datetime, int]:
+    position = decode_cursor(cursor)
+    try:
+        created_at = datetime.fromisoformat(position["created_at"])
+        row_id = position["id"]
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursorError("Invalid pagination cursor")
+    if not isinstance(row_id, int):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return created_at, row_id
+
+
+def keyset_page(rows: Sequence[T], limit: int, sort_key: str = "created_at") -> Tuple[Sequence[T], Optional[str]]:
+    """Trim newest-first rows fetched with limit + 1 to the page, plus the cursor
+    for the next one when the extra row shows more remain"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_keyset_cursor(getattr(last, sort_key), last.id)
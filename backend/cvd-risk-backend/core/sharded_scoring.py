@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.model_utils import FEATURE_NAMES, ScoredBatch, risk_percentages, score_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+# Arrays of one chunk, laid out back to back in a single shared memory block.
+# Workers read their shard's rows of the inputs and fill the same rows of the outputs.
+_INPUTS = (("row_ids", "<i8", ()), ("features", "<f8", (len(FEATURE_NAMES),)))
+_OUTPUTS = (
+    ("probabilities", "<f8", ()),
+    ("category_idx", "u1", ()),
+    ("cell_errors", "u1", (len(FEATURE_NAMES),))
+)
+_CONTRIBUTIONS = ("contributions", "<f8", (len(FEATURE_NAMES),))
+
+
+def _layout(rows: int, include_contributions: bool) -> Tuple[Dict[str, Tuple[int, str, Tuple[int, ...]]], int]:
+    """Offset, dtype and shape of every array, plus the block size"""
+    specs = _INPUTS + _OUTPUTS + ((_CONTRIBUTIONS,) if include_contributions else ())
+    layout = {}
+    offset = 0
+    for name, dtype, tail in specs:
+        shape = (rows,) + tail
+        layout[name] = (offset, dtype, shape)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += (size + 7) // 8 * 8
+    return layout, max(offset, 1)
+
+
+def _views(shm: SharedMemory, layout: Dict) -> Dict[str, np.ndarray]:
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        for name, (offset, dtype, shape) in layout.items()
+    }
+
+
+def _score_shard(
+        shm_name: str,
+        rows: int,
+        start: int,
+        stop: int,
+        active: Dict,
+        include_contributions: bool,
+        encode: bool
+):
+    """Runs in a pool worker: score rows [start, stop) of the shared chunk in place.
+
+    Returns the shard's encoded row group when `encode` is set, else None.
+    """
+    from core.result_store import encode_row_group
+
+    shm = SharedMemory(name=shm_name)
+    try:
+        arrays = _views(shm, _layout(rows, include_contributions)[0])
+        scored = score_feature_matrix(
+            arrays["features"][start:stop], arrays["row_ids"][start:stop], active, include_contributions
+        )
+        arrays["probabilities"][start:stop] = scored.probabilities
+        arrays["category_idx"][start:stop] = scored.category_idx
+        arrays["cell_errors"][start:stop] = scored.cell_errors
+        if include_contributions:
+            arrays["contributions"][start:stop] = scored.contributions
+        encoded = encode_row_group(scored) if encode else None
+        # Views must go before the block can be closed
+        del arrays, scored
+        return encoded
+    finally:
+        shm.close()
+
+
+class ShardedScorer:
+    """Scores large chunks across a process pool.
+
+    A chunk's feature matrix is copied once into shared memory; each worker
+    scores a contiguous shard of rows, writes the scores back next to it and,
+    for columnar sinks, also compresses the shard into a row group. Only the
+    shared memory name, shard bounds and model snapshot are pickled, and results
+    are reassembled in row order.
+    """
+
+    def __init__(self, workers: int, shard_rows: int):
+        self.workers = workers
+        self.shard_rows = shard_rows
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._chunks = 0
+        self._rows = 0
+        self._busy_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    @property
+    def chunk_rows(self) -> int:
+        """Rows to parse per chunk so every worker gets a full shard"""
+        return self.workers * self.shard_rows
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned rather than forked: the parent runs an event loop and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def score(
+            self,
+            features: np.ndarray,
+            row_ids: np.ndarray,
+            active: Dict,
+            include_contributions: bool = False,
+            encode: bool = False
+    ) -> Tuple[ScoredBatch, List]:
+        """Score a chunk; returns it as one ScoredBatch plus, with `encode`, one
+        encoded row group per shard in row order"""
+        rows = len(features)
+        layout, size = _layout(rows, include_contributions)
+        shard = max(1, -(-rows // self.workers))
+        bounds = [(start, min(start + shard, rows)) for start in range(0, rows, shard)]
+
+        started = time.perf_counter()
+        shm = SharedMemory(create=True, size=size)
+        try:
+            arrays = _views(shm, layout)
+            arrays["features"][:] = features
+            arrays["row_ids"][:] = row_ids
+
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            encoded = await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, _score_shard, shm.name, rows, start, stop, active, include_contributions, encode
+                )
+                for start, stop in bounds
+            ))
+
+            probabilities = arrays["probabilities"].copy()
+            category_idx = arrays["category_idx"].astype(np.intp)
+            cell_errors = arrays["cell_errors"].copy()
+            contributions = arrays["contributions"].copy() if include_contributions else None
+            del arrays
+        finally:
+            shm.close()
+            shm.unlink()
+
+        scored = ScoredBatch(
+            row_ids=row_ids,
+            features=features,
+            cell_errors=cell_errors,
+            valid=~cell_errors.any(axis=1),
+            probabilities=probabilities,
+            risk_percent=risk_percentages(probabilities),
+            category_idx=category_idx,
+            contributions=contributions,
+            model_version=active["version"]
+        )
+
+        self._chunks += 1
+        self._rows += rows
+        self._busy_seconds += time.perf_counter() - started
+        return scored, list(encoded) if encode else []
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "enabled": self.enabled,
+            "shard_rows": self.shard_rows,
+            "chunks": self._chunks,
+            "rows": self._rows,
+            "busy_seconds": round(self._busy_seconds, 3)
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+sharded_scorer = ShardedScorer(
+    workers=settings.BATCH_SHARD_WORKERS,
+    shard_rows=settings.BATCH_SHARD_ROWS
+)
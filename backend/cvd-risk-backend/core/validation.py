@@ -0,0 +1,91 @@
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+from schemas.predict import PredictionInput
+
+# Per-cell validation codes, most severe first when a cell breaks several rules
+CELL_OK = 0
+CELL_MISSING = 1  # Empty or non-numeric
+CELL_OUT_OF_RANGE = 2
+CELL_NOT_INTEGER = 3
+
+
+class FeatureRule(NamedTuple):
+    name: str
+    dtype: type  # int or float, as declared on the schema
+    minimum: float
+    maximum: float
+
+
+def feature_rules(schema: Type[BaseModel]) -> List[FeatureRule]:
+    """Type and ge/le bounds of every schema field, in declaration order"""
+    rules = []
+    for name, field in schema.model_fields.items():
+        minimum, maximum = -np.inf, np.inf
+        for constraint in field.metadata:
+            minimum = getattr(constraint, "ge", minimum)
+            maximum = getattr(constraint, "le", maximum)
+        rules.append(FeatureRule(name, field.annotation, float(minimum), float(maximum)))
+    return rules
+
+
+# Read from PredictionInput, which /predict/single validates against, so the
+# single and batch paths can't disagree about what a valid row is
+FEATURE_RULES = feature_rules(PredictionInput)
+FEATURE_NAMES = [rule.name for rule in FEATURE_RULES]
+_MINIMUMS = np.array([rule.minimum for rule in FEATURE_RULES])
+_MAXIMUMS = np.array([rule.maximum for rule in FEATURE_RULES])
+_INTEGER = np.array([rule.dtype is int for rule in FEATURE_RULES])
+
+
+def validate_features(features: np.ndarray) -> np.ndarray:
+    """(n, 7) uint8 matrix of CELL_* codes for a float64 feature matrix with
+    NaN wherever the input was empty or non-numeric"""
+    with np.errstate(invalid="ignore"):
+        missing = ~np.isfinite(features)
+        out_of_range = (features < _MINIMUMS) | (features > _MAXIMUMS)
+        not_integer = _INTEGER & (features != np.round(features))
+    return np.select(
+        [missing, out_of_range, not_integer],
+        [CELL_MISSING, CELL_OUT_OF_RANGE, CELL_NOT_INTEGER],
+        CELL_OK
+    ).astype(np.uint8)
+
+
+def _bound(value: float) -> str:
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def _cell_message(code: int, rule: FeatureRule) -> str:
+    if code == CELL_OUT_OF_RANGE:
+        return f"{rule.name} must be between {_bound(rule.minimum)} and {_bound(rule.maximum)}"
+    return f"{rule.name} must be a whole number"
+
+
+def describe_cell_errors(codes: Tuple[int, ...]) -> str:
+    """What is wrong with a row, from its cell codes"""
+    missing = [rule.name for rule, code in zip(FEATURE_RULES, codes) if code == CELL_MISSING]
+    parts = [f"Missing or non-numeric values for {', '.join(missing)}"] if missing else []
+    parts += [
+        _cell_message(code, rule)
+        for rule, code in zip(FEATURE_RULES, codes)
+        if code not in (CELL_OK, CELL_MISSING)
+    ]
+    return "; ".join(parts)
+
+
+def row_error_messages(cell_errors: np.ndarray, rows: Iterable[int]) -> List[str]:
+    """Error text for the given rows. Bad rows tend to fail the same way, so each
+    distinct pattern of cell codes is described once"""
+    described: Dict[bytes, str] = {}
+    messages = []
+    for i in rows:
+        key = cell_errors[i].tobytes()
+        message = described.get(key)
+        if message is None:
+            message = f"Prediction error: {describe_cell_errors(tuple(cell_errors[i].tolist()))}"
+            described[key] = message
+        messages.append(message)
+    return messages
@@ -1,10 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func, and_, between, or_
-from typing import Optional, Sequence, Dict, List
+from sqlalchemy import select, insert, update, delete, desc, func, and_, between, or_, literal, String
+from sqlalchemy.orm import load_only, undefer
+from typing import Iterable, Optional, Sequence, Dict, List, Tuple
 from datetime import datetime, timedelta, timezone
 import json
 import logging
 
+from core.config import settings
 from db.models import User, Prediction, ChatSession, ChatMessage, BatchPrediction
 
 logger = logging.getLogger(__name__)
@@ -26,7 +28,6 @@ async def create_user(db: AsyncSession, email: str, full_name: str, hashed_passw
     )
     db.add(db_user)
     await db.commit()
-    await db.refresh(db_user)
     return db_user
 
 
@@ -55,24 +56,78 @@ async def create_prediction(db: AsyncSession, prediction_data: dict, user_id: in
     )
     db.add(db_prediction)
     await db.commit()
-    await db.refresh(db_prediction)
     return db_prediction
 
 
-async def get_user_predictions(db: AsyncSession, user_id: int, limit: int = 10) -> Sequence[Prediction]:
-    result = await db.execute(
+async def bulk_create_predictions(
+        db: AsyncSession,
+        predictions: Iterable[dict],
+        user_id: int,
+        batch_id: Optional[int] = None,
+        chunk_rows: Optional[int] = None
+) -> int:
+    """Insert many predictions, one executemany (a multi-row INSERT on MySQL)
+    per `chunk_rows`. Neither commits nor refreshes: the caller owns the
+    transaction, and no ORM objects are built. Returns the rows inserted."""
+    chunk_rows = chunk_rows or settings.PREDICTION_BULK_INSERT_ROWS
+    # A table-level insert skips the ORM's per-row bulk bookkeeping, about 1.5x faster
+    statement = insert(Prediction.__table__)
+    inserted = 0
+    rows = []
+    for data in predictions:
+        rows.append({
+            "user_id": user_id,
+            "batch_id": batch_id,
+            "sex": data["sex"],
+            "age": data["age"],
+            "cigs_per_day": data["cigsPerDay"],
+            "tot_chol": data["totChol"],
+            "sys_bp": data["sysBP"],
+            "dia_bp": data["diaBP"],
+            "glucose": data["glucose"],
+            "probability": data["probability"],
+            "risk_percentage": data["risk_percentage"],
+            "risk_category": data["risk_category"]
+        })
+        if len(rows) >= chunk_rows:
+            await db.execute(statement, rows)
+            inserted += len(rows)
+            rows = []
+    if rows:
+        await db.execute(statement, rows)
+        inserted += len(rows)
+    return inserted
+
+
+async def delete_batch_row_predictions(db: AsyncSession, batch_id: int):
+    """Drop a batch's persisted rows, so persisting it again doesn't double count. No commit"""
+    await db.execute(delete(Prediction).where(Prediction.batch_id == batch_id))
+
+
+async def get_user_predictions(
+        db: AsyncSession,
+        user_id: int,
+        limit: int = 10,
+        before: Optional[Tuple[datetime, int]] = None
+) -> Sequence[Prediction]:
+    """A user's predictions newest first, optionally after a keyset position"""
+    # Rows persisted from batch uploads count in statistics, not in personal history
+    query = (
         select(Prediction)
-        .where(Prediction.user_id == user_id)
-        .order_by(desc(Prediction.created_at))
+        .where(Prediction.user_id == user_id, Prediction.batch_id.is_(None))
+        .order_by(desc(Prediction.created_at), desc(Prediction.id))
         .limit(limit)
     )
+    if before is not None:
+        query = query.where(_created_before(Prediction, before))
+    result = await db.execute(query)
     return result.scalars().all()
 
 
 async def get_latest_prediction(db: AsyncSession, user_id: int) -> Optional[Prediction]:
     result = await db.execute(
         select(Prediction)
-        .where(Prediction.user_id == user_id)
+        .where(Prediction.user_id == user_id, Prediction.batch_id.is_(None))
         .order_by(desc(Prediction.created_at))
         .limit(1)
     )
@@ -88,23 +143,230 @@ async def create_batch_prediction(db: AsyncSession, batch_data: dict, user_id: i
         total_records=batch_data["total_records"],
         successful_predictions=batch_data["successful_predictions"],
         failed_predictions=batch_data["failed_predictions"],
-        results=json.dumps(batch_data["results"])
+        content_hash=batch_data.get("content_hash"),
+        # Results normally live in the columnar result store, not in this row
+        results=json.dumps(batch_data["results"]) if batch_data.get("results") is not None else None
     )
     db.add(db_batch)
     await db.commit()
-    await db.refresh(db_batch)
     return db_batch
 
 
-async def get_user_batch_predictions(db: AsyncSession, user_id: int) -> Sequence[BatchPrediction]:
-    result = await db.execute(
+def _keyset_before(sort_column, id_column, position: Tuple[datetime, int]):
+    """Rows after `position` in newest-first (sort_column, id) order"""
+    value, row_id = position
+    # Bound as text in the server default's format: SQLite compares timestamps as
+    # strings, and a typed parameter would gain a ".000000" the stored values lack
+    boundary = literal(value.isoformat(sep=" "), String)
+    return or_(
+        sort_column < boundary,
+        and_(sort_column == boundary, id_column < row_id)
+    )
+
+
+def _created_before(model, position: Tuple[datetime, int]):
+    return _keyset_before(model.created_at, model.id, position)
+
+
+async def get_user_batch_predictions(
+        db: AsyncSession,
+        user_id: int,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, int]] = None
+) -> Sequence[BatchPrediction]:
+    """Summary columns of a doctor's batches, newest first, optionally after a keyset position"""
+    query = (
         select(BatchPrediction)
+        .options(load_only(
+            BatchPrediction.id,
+            BatchPrediction.filename,
+            BatchPrediction.total_records,
+            BatchPrediction.successful_predictions,
+            BatchPrediction.failed_predictions,
+            BatchPrediction.created_at,
+            BatchPrediction.status,
+            raiseload=True
+        ))
         .where(BatchPrediction.user_id == user_id)
-        .order_by(desc(BatchPrediction.created_at))
+        .order_by(desc(BatchPrediction.created_at), desc(BatchPrediction.id))
     )
+    if before is not None:
+        query = query.where(_created_before(BatchPrediction, before))
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
 
+async def get_batch_prediction(
+        db: AsyncSession,
+        batch_id: int,
+        user_id: int,
+        include_results: bool = False
+) -> Optional[BatchPrediction]:
+    query = select(BatchPrediction).where(
+        and_(
+            BatchPrediction.id == batch_id,
+            BatchPrediction.user_id == user_id
+        )
+    )
+    if include_results:
+        query = query.options(undefer(BatchPrediction.results))
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
+async def find_batch_by_content_hash(db: AsyncSession, content_hash: str, user_id: int) -> Optional[BatchPrediction]:
+    """The user's newest completed batch with this content hash. Other users'
+    batches never match: a hit would reveal that they uploaded the same data"""
+    result = await db.execute(
+        select(BatchPrediction)
+        .where(
+            and_(
+                BatchPrediction.content_hash == content_hash,
+                BatchPrediction.user_id == user_id,
+                BatchPrediction.status == "completed"
+            )
+        )
+    )
+    # Re-uploads are answered from the first batch, so there is rarely more than one
+    # row to rank, and ranking here keeps the lookup free of a sort
+    return max(result.scalars().all(), key=lambda batch: (batch.created_at, batch.id), default=None)
+
+
+# -------------------- Batch Jobs --------------------
+
+async def create_batch_job(
+        db: AsyncSession,
+        user_id: int,
+        filename: str,
+        upload_path: str,
+        estimated_records: int,
+        include_contributions: bool = False
+) -> BatchPrediction:
+    db_job = BatchPrediction(
+        user_id=user_id,
+        filename=filename,
+        total_records=estimated_records,
+        successful_predictions=0,
+        failed_predictions=0,
+        status="queued",
+        processed_records=0,
+        include_contributions=include_contributions,
+        upload_path=upload_path
+    )
+    db.add(db_job)
+    await db.commit()
+    return db_job
+
+
+async def claim_batch_job(db: AsyncSession, job_id: int, stale_before: datetime) -> bool:
+    """Atomically take a queued job, or a running one whose worker stopped heartbeating.
+
+    The conditional UPDATE makes sure only one worker process runs a job.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(BatchPrediction)
+        .where(
+            and_(
+                BatchPrediction.id == job_id,
+                or_(
+                    BatchPrediction.status == "queued",
+                    and_(
+                        BatchPrediction.status == "running",
+                        BatchPrediction.heartbeat_at < stale_before
+                    )
+                )
+            )
+        )
+        .values(
+            status="running",
+            processed_records=0,
+            successful_predictions=0,
+            failed_predictions=0,
+            started_at=now,
+            heartbeat_at=now
+        )
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def get_pending_batch_job_ids(db: AsyncSession, stale_before: datetime) -> List[int]:
+    result = await db.execute(
+        select(BatchPrediction.id)
+        .where(
+            or_(
+                BatchPrediction.status == "queued",
+                and_(
+                    BatchPrediction.status == "running",
+                    BatchPrediction.heartbeat_at < stale_before
+                )
+            )
+        )
+    )
+    # Oldest first. Sorted here: ORDER BY id would have the planner walk the whole
+    # table in id order instead of looking up the few pending rows by status
+    return sorted(result.scalars().all())
+
+
+async def update_batch_job_progress(
+        db: AsyncSession,
+        job_id: int,
+        processed: int,
+        successful: int,
+        failed: int
+):
+    await db.execute(
+        update(BatchPrediction)
+        .where(BatchPrediction.id == job_id)
+        .values(
+            processed_records=processed,
+            successful_predictions=successful,
+            failed_predictions=failed,
+            heartbeat_at=datetime.now(timezone.utc)
+        )
+    )
+    await db.commit()
+
+
+async def complete_batch_job(db: AsyncSession, job_id: int, total: int, successful: int, failed: int):
+    """Mark a job done; its results are in the columnar result store"""
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        update(BatchPrediction)
+        .where(BatchPrediction.id == job_id)
+        .values(
+            status="completed",
+            total_records=total,
+            processed_records=total,
+            successful_predictions=successful,
+            failed_predictions=failed,
+            upload_path=None,
+            completed_at=now,
+            heartbeat_at=now
+        )
+    )
+    await db.commit()
+
+
+async def fail_batch_job(db: AsyncSession, job_id: int, error_message: str):
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        update(BatchPrediction)
+        .where(BatchPrediction.id == job_id)
+        .values(
+            status="failed",
+            error_message=error_message,
+            upload_path=None,
+            completed_at=now,
+            heartbeat_at=now
+        )
+    )
+    await db.commit()
+
+
 # -------------------- Chat Sessions & Messages --------------------
 
 async def get_or_create_chat_session(
@@ -125,7 +387,6 @@ async def get_or_create_chat_session(
         )
         db.add(session)
         await db.commit()
-        await db.refresh(session)
     return session
 
 
@@ -144,26 +405,46 @@ async def create_chat_message(
     )
     db.add(db_message)
     await db.commit()
-    await db.refresh(db_message)
     return db_message
 
 
-async def get_chat_history(db: AsyncSession, session_id: str, limit: int = 50) -> Sequence[ChatMessage]:
-    result = await db.execute(
+async def get_chat_history(
+        db: AsyncSession,
+        session_id: str,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None
+) -> Sequence[ChatMessage]:
+    """A session's messages newest first, optionally older than a keyset position"""
+    query = (
         select(ChatMessage)
         .where(ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.created_at)
+        .order_by(desc(ChatMessage.created_at), desc(ChatMessage.id))
         .limit(limit)
     )
+    if before is not None:
+        query = query.where(_created_before(ChatMessage, before))
+    result = await db.execute(query)
     return result.scalars().all()
 
 
-async def get_user_chat_sessions(db: AsyncSession, user_id: int) -> Sequence[ChatSession]:
-    result = await db.execute(
+async def get_user_chat_sessions(
+        db: AsyncSession,
+        user_id: int,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, int]] = None
+) -> Sequence[ChatSession]:
+    """A user's sessions, most recently updated first, optionally after a keyset
+    position on (updated_at, id)"""
+    query = (
         select(ChatSession)
         .where(ChatSession.user_id == user_id)
-        .order_by(desc(ChatSession.updated_at))
+        .order_by(desc(ChatSession.updated_at), desc(ChatSession.id))
     )
+    if before is not None:
+        query = query.where(_keyset_before(ChatSession.updated_at, ChatSession.id, before))
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
 
@@ -291,8 +572,8 @@ async def generate_recent_activities(
 
     # Get recent chat sessions for patients
     if role == "patient":
-        chat_sessions = await get_user_chat_sessions(db, user_id)
-        for session in chat_sessions[:min(limit, len(chat_sessions))]:
+        chat_sessions = await get_user_chat_sessions(db, user_id, limit)
+        for session in chat_sessions:
             activities.append({
                 "id": f"chat_{session.session_id}",
                 "description": "Chat session with doctor",
@@ -1,3 +1,4 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from core.config import settings
@@ -5,11 +6,22 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+def connect_args(url: str) -> dict:
+    """Driver options every connection needs"""
+    if make_url(url).get_backend_name() == "mysql":
+        # NOW() defaults follow the session time zone. Pinning it to UTC keeps them on
+        # the same clock as the timestamps db.models stamps client side
+        return {"init_command": "SET time_zone = '+00:00'"}
+    return {}
+
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     pool_pre_ping=True,
-    pool_recycle=3600
+    pool_recycle=3600,
+    connect_args=connect_args(settings.DATABASE_URL)
 )
 
 async_session = async_sessionmaker(
@@ -0,0 +1,36 @@
+"""Batch job tracking columns
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('batch_predictions',
+                  sa.Column('status', sa.String(length=20), server_default='completed', nullable=False))
+    op.add_column('batch_predictions',
+                  sa.Column('processed_records', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('batch_predictions',
+                  sa.Column('include_contributions', sa.Boolean(), server_default='0', nullable=False))
+    op.add_column('batch_predictions', sa.Column('upload_path', sa.String(length=512), nullable=True))
+    op.add_column('batch_predictions', sa.Column('error_message', sa.Text(), nullable=True))
+    op.add_column('batch_predictions', sa.Column('started_at', sa.DateTime(), nullable=True))
+    op.add_column('batch_predictions', sa.Column('completed_at', sa.DateTime(), nullable=True))
+    op.add_column('batch_predictions', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+    # The job sweeper looks up queued and stale running jobs by status
+    op.create_index('idx_batch_predictions_status', 'batch_predictions', ['status'])
+
+
+def downgrade():
+    op.drop_index('idx_batch_predictions_status', table_name='batch_predictions')
+    for column in ('heartbeat_at', 'completed_at', 'started_at', 'error_message',
+                   'upload_path', 'include_contributions', 'processed_records', 'status'):
+        op.drop_column('batch_predictions', column)
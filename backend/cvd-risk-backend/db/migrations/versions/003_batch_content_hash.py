@@ -0,0 +1,24 @@
+"""Batch upload content hashes
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('batch_predictions', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # Every CSV upload looks for an earlier batch with the same hash
+    op.create_index('idx_batch_predictions_content_hash', 'batch_predictions', ['content_hash'])
+
+
+def downgrade():
+    op.drop_index('idx_batch_predictions_content_hash', table_name='batch_predictions')
+    op.drop_column('batch_predictions', 'content_hash')
@@ -0,0 +1,30 @@
+"""Batch rows persisted as predictions
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('predictions', sa.Column('batch_id', sa.Integer(), nullable=True))
+    # Created before the foreign key, which MySQL would otherwise give an index of its own.
+    # Re-persisting a batch deletes its earlier rows by batch_id
+    op.create_index('idx_predictions_batch_id', 'predictions', ['batch_id'])
+    op.create_foreign_key(
+        'fk_predictions_batch_id', 'predictions', 'batch_predictions',
+        ['batch_id'], ['id'], ondelete='CASCADE'
+    )
+
+
+def downgrade():
+    # The foreign key goes first: MySQL won't drop an index a foreign key still uses
+    op.drop_constraint('fk_predictions_batch_id', 'predictions', type_='foreignkey')
+    op.drop_index('idx_predictions_batch_id', table_name='predictions')
+    op.drop_column('predictions', 'batch_id')
@@ -0,0 +1,51 @@
+"""Composite indexes for the per-user and per-session queries
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# Each index serves an equality filter followed by the column the query sorts
+# or ranges on, so rows come out of the index in order with no sort step
+INDEXES = [
+    # Personal history and latest prediction: user_id, batch_id IS NULL, newest first
+    ('idx_predictions_user_history', 'predictions', ['user_id', 'batch_id', 'created_at']),
+    # Per-user statistics: count, last-7-days count and category breakdown, read from the
+    # index alone. risk_category comes second so GROUP BY reads the groups in order
+    ('idx_predictions_user_risk', 'predictions', ['user_id', 'risk_category', 'created_at']),
+    # Category breakdown across all predictions, grouped without a sort
+    ('idx_predictions_risk_category', 'predictions', ['risk_category']),
+    ('idx_chat_messages_session_created', 'chat_messages', ['session_id', 'created_at']),
+    ('idx_chat_sessions_user_updated', 'chat_sessions', ['user_id', 'updated_at']),
+    # New-patient counts and the doctor's registration timeline
+    ('idx_users_role_created', 'users', ['role', 'created_at']),
+    # Batch history pages, newest first
+    ('idx_batch_predictions_user_created', 'batch_predictions', ['user_id', 'created_at']),
+]
+
+# Single-column indexes that are now a prefix of a composite one. They are
+# dropped after the composites exist, which MySQL needs for the foreign keys
+REPLACED = [
+    ('idx_predictions_user_id', 'predictions', ['user_id']),
+    ('idx_chat_sessions_user_id', 'chat_sessions', ['user_id']),
+    ('idx_batch_predictions_user_id', 'batch_predictions', ['user_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for name, table, _ in REPLACED:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade():
+    for name, table, columns in REPLACED:
+        op.create_index(name, table, columns)
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,38 @@
+"""chat_sessions.updated_at NOT NULL
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+UPDATED_AT_DEFAULT = sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')
+
+
+def upgrade():
+    # Session lists are keyset-paged on (updated_at, id), so every row needs a value.
+    # Sessions that never got one sort by when they were created
+    op.execute(
+        "UPDATE chat_sessions SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+        "WHERE updated_at IS NULL"
+    )
+    op.alter_column(
+        'chat_sessions', 'updated_at',
+        existing_type=sa.DateTime(),
+        existing_server_default=UPDATED_AT_DEFAULT,
+        nullable=False,
+    )
+
+
+def downgrade():
+    op.alter_column(
+        'chat_sessions', 'updated_at',
+        existing_type=sa.DateTime(),
+        existing_server_default=UPDATED_AT_DEFAULT,
+        nullable=True,
+    )
@@ -1,14 +1,20 @@
+from datetime import datetime, timezone
+
 from sqlalchemy import (
     Column, Integer, String, Float, DateTime, Boolean,
-    ForeignKey, Text
+    ForeignKey, Index, Text, event
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from db.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    # Same indexes as the migrations, so create_all databases match migrated ones
+    __table_args__ = (
+        Index("idx_users_role_created", "role", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -27,6 +33,13 @@ class User(Base):
 
 class Prediction(Base):
     __tablename__ = "predictions"
+    __table_args__ = (
+        Index("idx_predictions_user_history", "user_id", "batch_id", "created_at"),
+        Index("idx_predictions_user_risk", "user_id", "risk_category", "created_at"),
+        Index("idx_predictions_risk_category", "risk_category"),
+        Index("idx_predictions_created_at", "created_at"),
+        Index("idx_predictions_batch_id", "batch_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -41,19 +54,24 @@ class Prediction(Base):
     risk_percentage = Column(Float, nullable=False)
     risk_category = Column(String(50), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    # Set for rows persisted from a batch upload, which belong to the uploading doctor
+    batch_id = Column(Integer, ForeignKey("batch_predictions.id", ondelete="CASCADE"), nullable=True)
 
     user = relationship("User", back_populates="predictions")
 
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("idx_chat_sessions_user_updated", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     session_id = Column(String(255), unique=True, nullable=False)
     session_name = Column(String(255), default="New Chat", nullable=False)
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     user = relationship("User", back_populates="chat_sessions")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
@@ -61,6 +79,9 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("idx_chat_messages_session_created", "session_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(255), ForeignKey("chat_sessions.session_id", ondelete="CASCADE"), nullable=False)
@@ -74,6 +95,11 @@ class ChatMessage(Base):
 
 class BatchPrediction(Base):
     __tablename__ = "batch_predictions"
+    __table_args__ = (
+        Index("idx_batch_predictions_user_created", "user_id", "created_at"),
+        Index("idx_batch_predictions_status", "status"),
+        Index("idx_batch_predictions_content_hash", "content_hash"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -81,7 +107,41 @@ class BatchPrediction(Base):
     total_records = Column(Integer, nullable=False)
     successful_predictions = Column(Integer, nullable=False)
     failed_predictions = Column(Integer, nullable=False)
-    results = Column(Text, nullable=True)
+    # Legacy JSON results, only set for batches stored before the columnar result
+    # store. Deferred so listing batches never drags the blob along
+    results = deferred(Column(Text, nullable=True), raiseload=True)
     created_at = Column(DateTime, server_default=func.now())
 
+    # Background job tracking; synchronous uploads are stored as "completed"
+    status = Column(String(20), default="completed", server_default="completed", nullable=False)
+    processed_records = Column(Integer, default=0, server_default="0", nullable=False)
+    include_contributions = Column(Boolean, default=False, server_default="0", nullable=False)
+    upload_path = Column(String(512), nullable=True)
+    error_message = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    # Deduplication: hash of the normalised upload, model and options. Only the
+    # same doctor's re-uploads are answered from an earlier batch
+    content_hash = Column(String(64), nullable=True)
+
     user = relationship("User", back_populates="batch_predictions")
+
+
+@event.listens_for(Base, "before_insert", propagate=True)
+def _stamp_server_timestamps(mapper, connection, target):
+    """Fill created_at/updated_at client side where INSERT .. RETURNING is missing.
+
+    With RETURNING (SQLite, MariaDB) the ORM reads server defaults back from the
+    INSERT itself. On MySQL it can't, so writes would need a SELECT (the old
+    commit-then-refresh) to learn them; setting them here leaves only the id,
+    which comes from lastrowid. Whole seconds in UTC, matching NOW() because
+    db.database pins MySQL sessions to UTC.
+    """
+    if connection.dialect.insert_returning:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    for name in ("created_at", "updated_at"):
+        if name in mapper.columns and getattr(target, name) is None:
+            setattr(target, name, now)
@@ -0,0 +1,24 @@
+"""
+Gunicorn settings for the shared-memory serving mode.
+
+The app (and the ML models, via PRELOAD_MODELS) is imported once in the master
+process before workers are forked, so all workers share those pages
+copy-on-write instead of each holding a private copy.
+
+    gunicorn -c gunicorn.conf.py main:app
+"""
+import gc
+import os
+
+os.environ.setdefault("PRELOAD_MODELS", "true")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach; otherwise collections
+    # in the workers touch every object header and un-share the pages
+    gc.freeze()
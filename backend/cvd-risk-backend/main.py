@@ -2,9 +2,11 @@ from fastapi import FastAPI, Request, status, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import logging
 import sys
+import time
 import traceback
 from typing import Dict, Any, Optional
 from slowapi import Limiter
@@ -12,7 +14,8 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from core.config import settings
-from core.model_utils import load_models, models
+from core.middleware import UploadSizeLimitMiddleware
+from core.model_utils import load_models, get_models
 from db.database import create_tables
 
 # Configure logging
@@ -29,6 +32,11 @@ chatbot: Optional[Any] = None
 # Rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
+# In preload mode (see gunicorn.conf.py) models load once in the master process and
+# workers inherit them copy-on-write instead of each loading their own copy
+if settings.PRELOAD_MODELS:
+    load_models()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -38,7 +46,10 @@ async def lifespan(app: FastAPI):
         "models": False,
         "chatbot": False
     }
+    # Wall time of each startup step, in milliseconds
+    startup_timings = {}
 
+    started = time.perf_counter()
     try:
         logger.info("Creating database tables...")
         await create_tables()
@@ -46,29 +57,57 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Database tables created successfully")
     except Exception as e:
         logger.error(f"❌ Database initialization failed: {str(e)}", exc_info=True)
+    startup_timings["database"] = round((time.perf_counter() - started) * 1000, 1)
 
+    started = time.perf_counter()
     try:
-        logger.info("Loading ML models...")
-        load_models()
+        if get_models():
+            logger.info("Using ML models preloaded before fork")
+            startup_status["model_source"] = "preloaded"
+        else:
+            logger.info("Loading ML models...")
+            startup_status["model_source"] = load_models()
         startup_status["models"] = True
-        if "classifier" in models and "scaler" in models:
-            logger.info("✅ ML models loaded successfully")
+        if get_models().get("version") != "dummy":
+            logger.info(f"✅ ML models loaded successfully (version {get_models()['version']})")
         else:
             logger.warning("⚠️ Using dummy models - production models not found")
     except Exception as e:
         logger.error(f"❌ Model loading failed: {str(e)}", exc_info=True)
+    startup_timings["models"] = round((time.perf_counter() - started) * 1000, 1)
 
-    try:
-        logger.info("Initializing chatbot service...")
-        from utils.chatbot import ChatbotService
-        chatbot = ChatbotService()
-        startup_status["chatbot"] = True
-        logger.info("✅ Chatbot service initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Chatbot initialization failed: {str(e)}", exc_info=True)
+    started = time.perf_counter()
+    if settings.FAST_STARTUP:
+        # The chat router creates its chatbot on the first message
+        logger.info("Fast startup: deferring chatbot initialization")
+    else:
+        try:
+            logger.info("Initializing chatbot service...")
+            from utils.chatbot import ChatbotService
+            chatbot = ChatbotService()
+            startup_status["chatbot"] = True
+            logger.info("✅ Chatbot service initialized successfully")
+        except Exception as e:
+            logger.error(f"❌ Chatbot initialization failed: {str(e)}", exc_info=True)
+    startup_timings["chatbot"] = round((time.perf_counter() - started) * 1000, 1)
 
-    logger.info(f"Application startup complete. Status: {startup_status}")
+    model_watcher = None
+    if settings.MODEL_WATCH_INTERVAL_SECONDS > 0:
+        from api.models import watch_active_model_version
+        model_watcher = asyncio.create_task(watch_active_model_version(settings.MODEL_WATCH_INTERVAL_SECONDS))
+
+    from core.batch_jobs import batch_job_runner
+    batch_job_runner.start()
+
+    logger.info(f"Application startup complete. Status: {startup_status} Timings (ms): {startup_timings}")
     yield
+    if model_watcher:
+        model_watcher.cancel()
+    await batch_job_runner.stop()
+    from core.executor import inference_executor
+    from core.sharded_scoring import sharded_scorer
+    inference_executor.shutdown()
+    sharded_scorer.shutdown()
     logger.info("Application shutdown")
 
 
@@ -83,6 +122,16 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Enforce upload size limits while the body streams in (inside CORS so 413s carry CORS headers)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/batch/predict-csv": settings.BATCH_MAX_UPLOAD_BYTES,
+        "/batch/jobs": settings.BATCH_JOB_MAX_UPLOAD_BYTES,
+        "/batch/predict-records": settings.BATCH_RECORDS_MAX_UPLOAD_BYTES
+    }
+)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -90,6 +139,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # SlowAPI rate limiting
@@ -113,6 +163,7 @@ def include_routers():
         ("api.chat", "/chat", ["AI Chat"]),
         ("api.profile", "/profile", ["User Profile"]),
         ("api.dashboard", "/dashboard", ["Dashboard"]),
+        ("api.models", "/models", ["Model Registry"]),
     ]
     for module_name, prefix, tags in routers_config:
         try:
@@ -172,11 +223,13 @@ async def health_check():
 
     # ML Models check
     try:
+        models = get_models()
         if "classifier" in models and "scaler" in models:
             health_status["components"]["ml_models"] = True
             health_status["details"]["ml_models"] = {
                 "classifier": type(models["classifier"]).__name__,
-                "scaler": type(models["scaler"]).__name__
+                "scaler": type(models["scaler"]).__name__,
+                "version": models.get("version")
             }
         else:
             health_status["status"] = "degraded"
@@ -185,6 +238,18 @@ async def health_check():
         health_status["status"] = "error"
         health_status["details"]["ml_models_error"] = str(e)
 
+    # Micro-batching, cache and executor metrics for inference
+    from core.micro_batcher import micro_batcher
+    from core.model_utils import prediction_cache
+    from core.executor import inference_executor
+    from core.batch_jobs import batch_job_runner
+    from core.sharded_scoring import sharded_scorer
+    health_status["details"]["micro_batcher"] = micro_batcher.stats()
+    health_status["details"]["prediction_cache"] = prediction_cache.stats()
+    health_status["details"]["inference_executor"] = inference_executor.stats()
+    health_status["details"]["batch_jobs"] = batch_job_runner.stats()
+    health_status["details"]["sharded_scoring"] = sharded_scorer.stats()
+
     # LLM Service check
     try:
         llm = LLMService()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 class BatchPredictionResult(BaseModel):
@@ -9,6 +9,7 @@ class BatchPredictionResult(BaseModel):
     successful_predictions: int
     failed_predictions: int
     created_at: datetime
+    status: str = "completed"
 
 class BatchUploadResponse(BaseModel):
     batch_id: int
@@ -17,8 +18,32 @@ class BatchUploadResponse(BaseModel):
     successful_predictions: int
     failed_predictions: int
     results: List[Dict[str, Any]]
+    deduplicated: bool = False  # Results of an earlier identical upload, not scored again
 
 class BatchResultsResponse(BaseModel):
     batch_id: int
     filename: str
-    results: List[Dict[str, Any]]
\ No newline at end of file
+    results: List[Dict[str, Any]]
+    total_records: Optional[int] = None
+    offset: int = 0
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+class BatchJobResponse(BaseModel):
+    job_id: int
+    filename: str
+    status: str
+    estimated_records: int
+
+class BatchJobStatus(BaseModel):
+    job_id: int
+    filename: str
+    status: str
+    total_records: int
+    processed_records: int
+    successful_predictions: int
+    failed_predictions: int
+    progress: float
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
@@ -81,7 +81,8 @@ class ChatResponse(BaseModel):
 
 class ChatHistory(BaseModel):
     session_id: str
-    messages: List[Dict]
+    messages: List[Dict]  # Oldest first
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the messages before these
 
 
 class ChatSessionInfo(BaseModel):
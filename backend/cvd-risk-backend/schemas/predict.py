@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class PredictionInput(BaseModel):
@@ -12,12 +12,18 @@ class PredictionInput(BaseModel):
     glucose: float = Field(..., ge=50, le=500)
 
 class PredictionOutput(BaseModel):
+    # model_version is ours, not one of pydantic's model_* attributes
+    model_config = ConfigDict(protected_namespaces=())
+
     probability: float
     risk_percentage: float
     risk_category: str
     risk_color: str
     features_used: dict
     personalized_advice: str
+    model_version: Optional[str] = None
+    feature_contributions: Optional[Dict[str, float]] = None  # Contribution of each feature to the logit
+    key_factors: Optional[List[str]] = None  # Features raising the risk most, largest first
     prediction_id: Optional[int] = None
     created_at: Optional[datetime] = None
 
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Settings are read when core.config is first imported, so the test environment
+# has to be in place before any test module imports the app
+_scratch = tempfile.mkdtemp(prefix="cvd-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{os.path.join(_scratch, 'app.db')}",
+    SECRET_KEY="test-secret-key",
+    GROQ_API_KEY="test",
+    DEBUG="false",
+    MODEL_CACHE_DIR=os.path.join(_scratch, "models"),
+    BATCH_JOB_DIR=os.path.join(_scratch, "batch_jobs"),
+    BATCH_RESULTS_DIR=os.path.join(_scratch, "batch_results"),
+    # No background sweeps, whose queries would land in the tests' statement counts
+    BATCH_JOB_WORKERS="0",
+)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_scratch, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup run: tables, demo users and models"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _auth_headers(email: str, role: str) -> dict:
+    from core.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': email, 'role': role})}"}
+
+
+@pytest.fixture(scope="session")
+def doctor_headers(client) -> dict:
+    return _auth_headers("doctor@demo.com", "doctor")
+
+
+@pytest.fixture(scope="session")
+def patient_headers(client) -> dict:
+    return _auth_headers("patient@demo.com", "patient")
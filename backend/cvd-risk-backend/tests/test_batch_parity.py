@@ -0,0 +1,36 @@
+import json
+
+import numpy as np
+
+from core.model_utils import (
+    build_prediction_result, build_models, risk_percentages, scored_batch_ndjson, scored_batch_records,
+    score_feature_matrix
+)
+from tests.test_fused_kernel import fitted_models, random_features
+
+COMPARED = ["probability", "risk_percentage", "risk_category", "features_used"]
+
+
+def test_batch_rows_match_single_predictions():
+    scaler, classifier = fitted_models()
+    active = build_models(classifier, scaler, "parity")
+    features = random_features(2000, seed=6)
+
+    scored = score_feature_matrix(features, np.arange(len(features)), active)
+    records = scored_batch_records(scored)
+    assert [json.loads(line) for line in scored_batch_ndjson(scored).splitlines()] == records
+
+    for row, probability, record in zip(features, scored.probabilities, records):
+        single = build_prediction_result(
+            [int(v) for v in row[:3]] + row[3:].tolist(), float(probability), model_version="parity"
+        )
+        assert {key: single[key] for key in COMPARED} == {key: record[key] for key in COMPARED}
+        assert all(type(record["features_used"][name]) is int for name in ("sex", "age", "cigsPerDay"))
+
+
+def test_rounding_ties_match():
+    # xx.xx5 percentages, where float rounding is most likely to differ between paths
+    probabilities = (np.arange(10000) * 2 + 1) * 5e-5
+    features = random_features(1, seed=7)[0].tolist()
+    single = [build_prediction_result(features, float(p))["risk_percentage"] for p in probabilities]
+    assert single == risk_percentages(probabilities).tolist()
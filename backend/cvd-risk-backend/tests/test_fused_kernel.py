@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from core.model_utils import compile_kernel
+from core.validation import FEATURE_RULES
+
+MINIMUMS = np.array([rule.minimum for rule in FEATURE_RULES])
+MAXIMUMS = np.array([rule.maximum for rule in FEATURE_RULES])
+TOLERANCE = 1e-9
+
+
+def random_features(n: int, seed: int) -> np.ndarray:
+    features = np.random.default_rng(seed).uniform(MINIMUMS, MAXIMUMS, size=(n, len(FEATURE_RULES)))
+    features[:, :3] = np.round(features[:, :3])  # sex, age and cigsPerDay are integers
+    return features
+
+
+def edge_features() -> np.ndarray:
+    """Bound corners, one feature at a time at each bound, and logits far enough
+    out that the sigmoid saturates"""
+    middle = (MINIMUMS + MAXIMUMS) / 2
+    rows = [MINIMUMS, MAXIMUMS, middle, np.zeros(len(FEATURE_RULES))]
+    for j in range(len(FEATURE_RULES)):
+        for bound in (MINIMUMS, MAXIMUMS):
+            row = middle.copy()
+            row[j] = bound[j]
+            rows.append(row)
+    rows += [MAXIMUMS * 1e3, -MAXIMUMS * 1e3, np.full(len(FEATURE_RULES), 1e6), np.full(len(FEATURE_RULES), -1e6)]
+    return np.array(rows, dtype=np.float64)
+
+
+def fitted_models(with_mean: bool = True, with_std: bool = True):
+    features = random_features(2000, seed=1)
+    scaler = StandardScaler(with_mean=with_mean, with_std=with_std).fit(features)
+    scaled = (features - MINIMUMS) / (MAXIMUMS - MINIMUMS)
+    labels = (scaled[:, 1] + scaled[:, 4] + scaled[:, 6] + np.random.default_rng(2).normal(0, 0.3, len(scaled))) > 1.5
+    classifier = LogisticRegression(max_iter=1000).fit(scaler.transform(features), labels)
+    return scaler, classifier
+
+
+@pytest.mark.parametrize("with_mean,with_std", [(True, True), (False, True), (True, False)])
+@pytest.mark.parametrize("inputs", ["random", "edge"])
+def test_kernel_matches_sklearn(with_mean, with_std, inputs):
+    scaler, classifier = fitted_models(with_mean, with_std)
+    kernel = compile_kernel(scaler, classifier)
+    assert kernel is not None
+    features = random_features(10000, seed=3) if inputs == "random" else edge_features()
+
+    expected = classifier.predict_proba(scaler.transform(features))[:, 1]
+    actual = kernel.predict_proba(features)
+
+    assert np.all(np.isfinite(actual))
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_contributions_add_up_to_the_sklearn_logit():
+    scaler, classifier = fitted_models()
+    kernel = compile_kernel(scaler, classifier)
+    features = random_features(10000, seed=4)
+
+    scaled = scaler.transform(features)
+    np.testing.assert_allclose(kernel.contributions(features), scaled * classifier.coef_[0], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(
+        kernel.contributions(features).sum(axis=1) + classifier.intercept_[0],
+        classifier.decision_function(scaled),
+        rtol=0, atol=TOLERANCE
+    )
+
+
+def test_unsupported_models_fall_back_to_sklearn():
+    features = random_features(100, seed=5)
+    scaler = MinMaxScaler().fit(features)
+    classifier = LogisticRegression().fit(scaler.transform(features), features[:, 0] > 0)
+    assert compile_kernel(scaler, classifier) is None
@@ -0,0 +1,26 @@
+from uuid import uuid4
+
+from core.config import settings
+
+
+def _register_admin(client) -> tuple:
+    email = f"{uuid4().hex[:12]}@demo.com"
+    response = client.post("/auth/register", json={
+        "email": email, "password": "Secret123!", "full_name": "Self Made Admin", "role": "admin"
+    })
+    assert response.status_code == 201, response.text
+    token = client.post("/auth/login", json={"email": email, "password": "Secret123!"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}, email
+
+
+def test_self_registered_admin_cannot_activate_models(client, monkeypatch):
+    headers, _ = _register_admin(client)
+    monkeypatch.setattr(settings, "MODEL_OPERATOR_EMAILS", [])
+    assert client.post("/models/reload", headers=headers).status_code == 403
+
+
+def test_listed_operator_passes_the_gate(client, monkeypatch):
+    headers, email = _register_admin(client)
+    monkeypatch.setattr(settings, "MODEL_OPERATOR_EMAILS", [email])
+    # No versions are registered in the test environment
+    assert client.post("/models/reload", headers=headers).status_code == 404
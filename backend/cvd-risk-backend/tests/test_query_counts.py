@@ -0,0 +1,106 @@
+"""Statements each HTTP request sends to the database.
+
+Writes must be a single INSERT, UPDATE or DELETE, with no SELECT to read
+back the generated id and timestamps. The expectations hold both with
+INSERT .. RETURNING (SQLite, PostgreSQL) and without it (MySQL), where the
+timestamps are filled in client side.
+"""
+import itertools
+import re
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+
+from db.database import engine
+
+_TABLE = re.compile(r"^\s*(?:(UPDATE)|(SELECT|INSERT|DELETE)\b.*?\b(?:FROM|INTO))\s+(\w+)", re.IGNORECASE | re.DOTALL)
+
+FEATURES = {"sex": 1, "age": 50, "cigsPerDay": 3, "totChol": 200, "sysBP": 120, "diaBP": 80, "glucose": 90}
+CSV = "sex,age,cigsPerDay,totChol,sysBP,diaBP,glucose\n1,{age},3,200,120,80,90\n"
+# Every upload differs, so none is answered from an earlier batch with the same content
+_ages = itertools.count(18)
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "no-returning"])
+def statements(request, client):
+    """Statements issued while the test runs, as "VERB table" strings"""
+    dialect = engine.sync_engine.dialect
+    insert_returning = dialect.insert_returning
+    # Without RETURNING the dialect behaves like MySQL
+    dialect.insert_returning = request.param
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        match = _TABLE.match(statement)
+        if match:
+            verb = match.group(1) or match.group(2)
+            captured.append(f"{verb.upper()} {match.group(3)}")
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield captured
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        dialect.insert_returning = insert_returning
+
+
+def _counted(statements, response, status_code=200):
+    assert response.status_code == status_code, response.text
+    return list(statements)
+
+
+def test_register(client, statements):
+    email = f"{uuid4().hex[:12]}@demo.com"
+    response = client.post("/auth/register", json={
+        "email": email, "password": "Secret123!", "full_name": "Query Count", "role": "patient"
+    })
+    assert _counted(statements, response, 201) == ["SELECT users", "INSERT users"]
+    assert response.json()["created_at"]
+
+
+def test_predict_single(client, statements, patient_headers):
+    response = client.post("/predict/single", json=FEATURES, headers=patient_headers)
+    assert _counted(statements, response) == ["SELECT users", "INSERT predictions"]
+    assert response.json()["prediction_id"] and response.json()["created_at"]
+
+
+def test_prediction_history(client, statements, patient_headers):
+    response = client.get("/predict/history", headers=patient_headers)
+    assert _counted(statements, response) == ["SELECT users", "SELECT predictions"]
+
+
+def test_new_chat_session(client, statements, patient_headers):
+    response = client.post("/chat/new-session", headers=patient_headers)
+    assert _counted(statements, response) == ["SELECT users", "SELECT chat_sessions", "INSERT chat_sessions"]
+    assert response.json()["created_at"]
+
+
+def test_chat_session_pages(client, statements, patient_headers):
+    session_id = client.post("/chat/new-session", headers=patient_headers).json()["session_id"]
+    del statements[:]
+
+    response = client.put(f"/chat/session/{session_id}/rename", params={"new_name": "Renamed"}, headers=patient_headers)
+    assert _counted(statements, response) == ["SELECT users", "SELECT chat_sessions", "UPDATE chat_sessions"]
+    del statements[:]
+
+    response = client.get(f"/chat/history/{session_id}", headers=patient_headers)
+    assert _counted(statements, response) == ["SELECT users", "SELECT chat_sessions", "SELECT chat_messages"]
+    del statements[:]
+
+    response = client.get("/chat/sessions", headers=patient_headers)
+    assert _counted(statements, response) == ["SELECT users", "SELECT chat_sessions"]
+
+
+def test_batch_upload(client, statements, doctor_headers):
+    csv = CSV.format(age=next(_ages))
+    response = client.post("/batch/predict-csv", files={"file": ("rows.csv", csv)}, headers=doctor_headers)
+    # The test client runs the background task that copies the rows into predictions
+    # before it returns, so its DELETE and bulk INSERT are counted here too
+    assert _counted(statements, response) == [
+        "SELECT users", "SELECT batch_predictions", "INSERT batch_predictions", "DELETE predictions", "INSERT predictions"
+    ]
+    del statements[:]
+
+    response = client.get("/batch/history", headers=doctor_headers)
+    assert _counted(statements, response) == ["SELECT users", "SELECT batch_predictions"]
@@ -0,0 +1,150 @@
+"""EXPLAIN every query the crud reads issue and fail on full scans and sorts.
+
+Runs against a scratch SQLite file seeded with rows spread like production.
+Set QUERY_PLAN_DATABASE_URL to an empty scratch MySQL database to check the
+production planner instead; the schema and sample rows are written into it.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db import crud
+from db.database import Base, connect_args
+from db.models import BatchPrediction, ChatMessage, ChatSession, Prediction, User
+
+NOW = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+STALE = datetime.now(timezone.utc) - timedelta(minutes=5)
+POSITION = (NOW - timedelta(days=30), 100)
+
+READS = {
+    "get_user_by_email": lambda db: crud.get_user_by_email(db, "explain-7@demo.com"),
+    "get_user_predictions": lambda db: crud.get_user_predictions(db, 7, 11),
+    "get_user_predictions (next page)": lambda db: crud.get_user_predictions(db, 7, 11, POSITION),
+    "get_latest_prediction": lambda db: crud.get_latest_prediction(db, 7),
+    "get_user_batch_predictions": lambda db: crud.get_user_batch_predictions(db, 20, 51),
+    "get_user_batch_predictions (next page)": lambda db: crud.get_user_batch_predictions(db, 20, 51, POSITION),
+    "get_batch_prediction": lambda db: crud.get_batch_prediction(db, 5, 20),
+    "find_batch_by_content_hash": lambda db: crud.find_batch_by_content_hash(db, f"{5:064x}", 20),
+    "get_pending_batch_job_ids": lambda db: crud.get_pending_batch_job_ids(db, STALE),
+    "get_or_create_chat_session": lambda db: crud.get_or_create_chat_session(db, "s7", 7),
+    "get_chat_history": lambda db: crud.get_chat_history(db, "s7", 51),
+    "get_chat_history (next page)": lambda db: crud.get_chat_history(db, "s7", 51, POSITION),
+    "get_user_chat_sessions": lambda db: crud.get_user_chat_sessions(db, 7, 101),
+    "get_user_chat_sessions (next page)": lambda db: crud.get_user_chat_sessions(db, 7, 101, POSITION),
+    "get_user_statistics": lambda db: crud.get_user_statistics(db, 7),
+    "get_all_statistics": lambda db: crud.get_all_statistics(db),
+    "generate_recent_activities (doctor)": lambda db: crud.generate_recent_activities(db, 20, "doctor"),
+    "generate_recent_activities (patient)": lambda db: crud.generate_recent_activities(db, 7, "patient"),
+}
+
+
+def plan_problems(dialect: str, statement: str, plan: list) -> list:
+    """Full scans, sorts and temporary tables in an EXPLAIN. Covering index scans
+    are fine for whole-table aggregates, which have no WHERE clause."""
+    whole_table = " WHERE " not in statement.upper()
+    problems = []
+    if dialect == "sqlite":
+        for row in plan:
+            detail = row[-1]
+            if detail.startswith("SCAN ") and not (whole_table and "COVERING INDEX" in detail):
+                problems.append(detail)
+            elif "TEMP B-TREE" in detail:
+                problems.append(detail)
+    else:
+        for row in plan:
+            row = dict(row._mapping)
+            extra = row.get("Extra") or ""
+            if row["type"] == "ALL" or (row["type"] == "index" and not whole_table):
+                problems.append(f"full scan of {row['table']} (type {row['type']})")
+            if "Using filesort" in extra:
+                problems.append(f"filesort on {row['table']}")
+            if "Using temporary" in extra:
+                problems.append(f"temporary table for {row['table']}")
+    return problems
+
+
+async def _seed(session_factory):
+    rng = np.random.default_rng(0)
+    users = [
+        {"email": f"explain-{i}@demo.com", "hashed_password": "-", "full_name": "Explain",
+         "role": "doctor" if i % 20 == 0 else "patient", "created_at": NOW - timedelta(days=int(i % 400))}
+        for i in range(1, 501)
+    ]
+    predictions = [
+        {"user_id": int(rng.integers(1, 501)), "sex": 1, "age": 50, "cigs_per_day": 0, "tot_chol": 200.0,
+         "sys_bp": 120.0, "dia_bp": 80.0, "glucose": 90.0, "probability": 0.1, "risk_percentage": 10.0,
+         "risk_category": ("Low", "Moderate", "High")[i % 3], "created_at": NOW - timedelta(minutes=i)}
+        for i in range(20000)
+    ]
+    batches = [
+        {"user_id": 20 * (i % 25 + 1), "filename": "a.csv", "total_records": 10, "successful_predictions": 10,
+         "failed_predictions": 0, "status": "completed" if i % 100 else ("queued", "running", "failed")[i // 100 % 3],
+         "content_hash": f"{i % 1000:064x}", "heartbeat_at": NOW - timedelta(minutes=i % 10),
+         "created_at": NOW - timedelta(hours=i)}
+        for i in range(2000)
+    ]
+    sessions = [{"user_id": int(rng.integers(1, 501)), "session_id": f"s{i}", "session_name": "Chat",
+                 "created_at": NOW, "updated_at": NOW - timedelta(hours=i)} for i in range(2000)]
+    messages = [{"session_id": f"s{i % 2000}", "message": "hi", "response": "hello", "source": "ai",
+                 "created_at": NOW - timedelta(minutes=i)} for i in range(20000)]
+    async with session_factory() as db:
+        for model, rows in ((User, users), (Prediction, predictions), (BatchPrediction, batches),
+                            (ChatSession, sessions), (ChatMessage, messages)):
+            await db.execute(insert(model.__table__), rows)
+        await db.commit()
+
+
+@pytest.fixture(scope="module")
+def database_url(tmp_path_factory):
+    url = os.environ.get("QUERY_PLAN_DATABASE_URL") or \
+        f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+
+    async def prepare():
+        engine = create_async_engine(url, connect_args=connect_args(url))
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await _seed(async_sessionmaker(engine, expire_on_commit=False))
+        async with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                await conn.exec_driver_sql("ANALYZE")
+            else:
+                for table in Base.metadata.sorted_tables:
+                    await conn.exec_driver_sql(f"ANALYZE TABLE {table.name}")
+        await engine.dispose()
+
+    asyncio.run(prepare())
+    return url
+
+
+async def _explain_read(url: str, read) -> list:
+    """(statement, plan) for every SELECT the read issues"""
+    engine = create_async_engine(url, connect_args=connect_args(url))
+    captured = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, *args:
+        captured.append((statement, parameters)) if statement.lstrip().upper().startswith("SELECT") else None
+    )
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        await read(db)
+    explain = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            plans.append((statement, (await conn.exec_driver_sql(explain + statement, parameters)).all()))
+    dialect = engine.dialect.name
+    await engine.dispose()
+    return [(statement, plan, plan_problems(dialect, statement, plan)) for statement, plan in plans]
+
+
+@pytest.mark.parametrize("name", READS)
+def test_read_uses_an_index_without_sorting(database_url, name):
+    explained = asyncio.run(_explain_read(database_url, READS[name]))
+    assert explained, f"{name} issued no SELECT"
+    failures = [f"{problems} in {statement}" for statement, _, problems in explained if problems]
+    assert not failures, "\n".join(failures)